@@ -0,0 +1,461 @@
+"""
+Local stand-ins for Microsoft Graph, OpenAI and Azure AI Search.
+
+Each factory returns a FastAPI app implementing just enough of the real REST
+surface for rag_app to run unmodified against it:
+
+- Graph: folder children, file content (with Range support), permissions,
+  delta and JSON $batch for one or more drives, plus the Azure AD JWKS
+  document used by /ask/secure.
+- OpenAI: /v1/embeddings (deterministic vectors) and /v1/chat/completions.
+- Azure Search: index create/get, document upload, $count and vector search
+  with the allowed_groups security filter, over any number of indexes (shards).
+
+Every app takes a latency_ms argument that is added to each request to
+simulate network and service time.
+"""
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import math
+import random
+import re
+import socket
+import struct
+import threading
+import time
+from typing import Optional, Union
+
+import uvicorn
+from docx import Document
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+
+WORDS = (
+    "revenue forecast quarter policy employee onboarding contract renewal "
+    "budget approval security review roadmap milestone customer escalation "
+    "compliance audit vendor invoice travel expense headcount benefits "
+    "procurement release incident postmortem architecture migration"
+).split()
+
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+async def _simulate_latency(latency_ms: float):
+    if latency_ms > 0:
+        await asyncio.sleep(latency_ms / 1000)
+
+
+def _error(status: int, code: str, message: str) -> JSONResponse:
+    return JSONResponse({"error": {"code": code, "message": message}}, status_code=status)
+
+
+# =========================
+# GRAPH
+# =========================
+def make_docx(seed: int, paragraphs: int) -> bytes:
+    """Build a DOCX of synthetic paragraphs, deterministic for a given seed."""
+    rng = random.Random(seed)
+    doc = Document()
+    for _ in range(paragraphs):
+        doc.add_paragraph(" ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 160))) + ".")
+    buf = io.BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+
+class GraphFixture:
+    """Synthetic drive contents served by the fake Graph app."""
+
+    def __init__(
+        self,
+        drive_id: str = "bench-drive",
+        folder_id: str = "bench-folder",
+        files: int = 50,
+        paragraphs: int = 40,
+        groups: int = 20,
+        duplicate_ratio: float = 0.1,
+        seed: int = 0,
+    ):
+        self.drive_id = drive_id
+        self.folder_id = folder_id
+        self.groups = [f"group-{i}" for i in range(groups)]
+        self.items: dict[str, dict] = {}
+        self.content: dict[str, bytes] = {}
+        self.permissions: dict[str, list[str]] = {}
+
+        rng = random.Random(seed)
+        for i in range(files):
+            item_id = f"item-{i:05d}"
+            # A share of files are copies of an earlier file ("v2 final" etc.)
+            if i and rng.random() < duplicate_ratio:
+                data = self.content[f"item-{rng.randrange(i):05d}"]
+            else:
+                data = make_docx(seed * 100003 + i, paragraphs)
+
+            self.content[item_id] = data
+            self.items[item_id] = {
+                "id": item_id,
+                "name": f"document-{i:05d}.docx",
+                "size": len(data),
+                "file": {"mimeType": DOCX_MIME},
+                "parentReference": {"driveId": drive_id, "id": folder_id},
+            }
+            self.permissions[item_id] = rng.sample(self.groups, k=min(len(self.groups), rng.randint(1, 3)))
+
+
+def create_graph_app(
+    fixtures: Union[GraphFixture, list[GraphFixture]],
+    latency_ms: float = 0.0,
+    jwks: Optional[dict] = None,
+) -> FastAPI:
+    """Fake Microsoft Graph (v1.0) serving one GraphFixture per drive."""
+    app = FastAPI(title="Fake Microsoft Graph")
+    if isinstance(fixtures, GraphFixture):
+        fixtures = [fixtures]
+    drives = {f.drive_id: f for f in fixtures}
+
+    def get_json(path: str) -> tuple[int, dict]:
+        """Dispatch a JSON GET; shared by the REST routes and $batch."""
+        path = path.split("?", 1)[0].strip("/")
+        parts = path.split("/")
+
+        if parts[:1] != ["drives"] or len(parts) < 3 or parts[1] not in drives:
+            return 404, {"error": {"code": "itemNotFound", "message": path}}
+        fixture = drives[parts[1]]
+
+        if parts[2:] == ["root", "delta"]:
+            return 200, {
+                "value": list(fixture.items.values()),
+                "@odata.deltaLink": f"/drives/{fixture.drive_id}/root/delta?token=bench",
+            }
+
+        if len(parts) == 5 and parts[2] == "items":
+            item_id, action = parts[3], parts[4]
+            if action == "children" and item_id == fixture.folder_id:
+                return 200, {"value": list(fixture.items.values())}
+            if action == "permissions" and item_id in fixture.permissions:
+                return 200, {
+                    "value": [
+                        {"id": f"perm-{g}", "roles": ["read"], "grantedToV2": {"group": {"id": g}}}
+                        for g in fixture.permissions[item_id]
+                    ]
+                }
+
+        return 404, {"error": {"code": "itemNotFound", "message": path}}
+
+    @app.get("/v1.0/drives/{drive_id}/items/{item_id}/content")
+    async def content(drive_id: str, item_id: str, request: Request):
+        await _simulate_latency(latency_ms)
+        data = drives[drive_id].content.get(item_id) if drive_id in drives else None
+        if data is None:
+            return _error(404, "itemNotFound", item_id)
+
+        range_header = request.headers.get("range")
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", range_header or "")
+        if not match:
+            return Response(data, media_type="application/octet-stream", headers={"Accept-Ranges": "bytes"})
+
+        start = int(match.group(1))
+        end = min(int(match.group(2)) if match.group(2) else len(data) - 1, len(data) - 1)
+        if start >= len(data):
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{len(data)}"})
+        return Response(
+            data[start:end + 1],
+            status_code=206,
+            media_type="application/octet-stream",
+            headers={"Content-Range": f"bytes {start}-{end}/{len(data)}", "Accept-Ranges": "bytes"},
+        )
+
+    @app.post("/v1.0/$batch")
+    async def batch(request: Request):
+        await _simulate_latency(latency_ms)
+        body = await request.json()
+        responses = []
+        for req in body.get("requests", []):
+            if req.get("method", "GET").upper() != "GET":
+                status, payload = 405, {"error": {"code": "methodNotAllowed", "message": req.get("method")}}
+            else:
+                status, payload = get_json(req.get("url", ""))
+            responses.append({"id": req.get("id"), "status": status, "body": payload})
+        return {"responses": responses}
+
+    @app.get("/v1.0/{path:path}")
+    async def graph_get(path: str):
+        await _simulate_latency(latency_ms)
+        status, payload = get_json(path)
+        return JSONResponse(payload, status_code=status)
+
+    @app.get("/discovery/v2.0/keys")
+    async def keys():
+        return jwks or {"keys": []}
+
+    return app
+
+
+# =========================
+# OPENAI
+# =========================
+def deterministic_vector(item, dimensions: int) -> list[float]:
+    """Unit vector derived from a hash of the input (text or token ids)."""
+    seed = hashlib.blake2b(json.dumps(item).encode("utf-8"), digest_size=8).digest()
+    rng = random.Random(seed)
+    vec = [rng.gauss(0.0, 1.0) for _ in range(dimensions)]
+    norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+    return [v / norm for v in vec]
+
+
+def create_openai_app(
+    dimensions: int = 256,
+    embed_latency_ms: float = 0.0,
+    chat_latency_ms: float = 0.0,
+) -> FastAPI:
+    """Fake OpenAI API: embeddings and chat completions."""
+    app = FastAPI(title="Fake OpenAI")
+    app.state.calls = {"embeddings": 0, "embedding_inputs": 0, "chat": 0}
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        await _simulate_latency(embed_latency_ms)
+        body = await request.json()
+        inputs = body["input"]
+        # Accept str, list[str], list[int] (one tokenized input) or list[list[int]]
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+
+        app.state.calls["embeddings"] += 1
+        app.state.calls["embedding_inputs"] += len(inputs)
+
+        base64_format = body.get("encoding_format") == "base64"
+        data = []
+        n_tokens = 0
+        for i, item in enumerate(inputs):
+            vec = deterministic_vector(item, body.get("dimensions") or dimensions)
+            n_tokens += len(item) if isinstance(item, list) else max(1, len(item) // 4)
+            embedding = (
+                base64.b64encode(struct.pack(f"<{len(vec)}f", *vec)).decode("ascii")
+                if base64_format else vec
+            )
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+
+        return {
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "fake-embedding"),
+            "usage": {"prompt_tokens": n_tokens, "total_tokens": n_tokens},
+        }
+
+    @app.post("/v1/chat/completions")
+    async def chat(request: Request):
+        await _simulate_latency(chat_latency_ms)
+        body = await request.json()
+        app.state.calls["chat"] += 1
+
+        prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+        answer = f"Benchmark answer from a {len(prompt)}-character prompt."
+        prompt_tokens = max(1, len(prompt) // 4)
+        completion_tokens = max(1, len(answer) // 4)
+        return {
+            "id": "chatcmpl-bench",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake-chat"),
+            "choices": [
+                {"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    return app
+
+
+# =========================
+# AZURE SEARCH
+# =========================
+_SEARCH_IN_RE = re.compile(r"search\.in\(\s*\w+\s*,\s*'([^']*)'\s*,\s*'([^']*)'\s*\)")
+_KEY_GT_RE = re.compile(r"(\w+)\s+gt\s+'((?:[^']|'')*)'")
+
+
+def _filter_matches(filter_expr: Optional[str], doc: dict) -> bool:
+    """Evaluate the subset of OData filters rag_app produces."""
+    if not filter_expr:
+        return True
+    if filter_expr.strip() == "1 eq 0":
+        return False
+    match = _SEARCH_IN_RE.search(filter_expr)
+    if match:
+        wanted = set(match.group(1).split(match.group(2) or ","))
+        return bool(wanted & set(doc.get("allowed_groups") or []))
+    match = _KEY_GT_RE.search(filter_expr)
+    if match:
+        return str(doc.get(match.group(1), "")) > match.group(2).replace("''", "'")
+    return True
+
+
+class _Index:
+    def __init__(self, definition: dict):
+        self.definition = definition
+        self.docs: dict[str, dict] = {}
+        self.key = next((f["name"] for f in definition.get("fields", []) if f.get("key")), "id")
+        self.vector_field = next(
+            (f["name"] for f in definition.get("fields", []) if f.get("dimensions")),
+            "content_vector",
+        )
+
+
+def create_search_app(latency_ms: float = 0.0, index_latency_ms: Optional[dict[str, float]] = None) -> FastAPI:
+    """
+    Fake Azure AI Search data and index plane; multiple indexes per service.
+
+    index_latency_ms adds extra search latency to specific indexes, e.g. to
+    simulate one slow shard.
+    """
+    app = FastAPI(title="Fake Azure AI Search")
+    indexes: dict[str, _Index] = {}
+    app.state.indexes = indexes
+
+    def put_index(definition: dict):
+        indexes.setdefault(definition["name"], _Index(definition)).definition = definition
+        return definition
+
+    @app.get("/indexes")
+    async def list_indexes():
+        return {"value": [i.definition for i in indexes.values()]}
+
+    @app.post("/indexes")
+    async def create_index(request: Request):
+        definition = await request.json()
+        if definition["name"] in indexes:
+            return _error(409, "ResourceNameAlreadyInUse", definition["name"])
+        return JSONResponse(put_index(definition), status_code=201)
+
+    @app.get("/indexes('{name}')")
+    async def get_index(name: str):
+        if name not in indexes:
+            return _error(404, "ResourceNotFound", f"No index with the name '{name}' was found")
+        return indexes[name].definition
+
+    @app.put("/indexes('{name}')")
+    async def create_or_update_index(name: str, request: Request):
+        definition = await request.json()
+        definition["name"] = name
+        return JSONResponse(put_index(definition), status_code=201 if name not in indexes else 200)
+
+    @app.delete("/indexes('{name}')")
+    async def delete_index(name: str):
+        if indexes.pop(name, None) is None:
+            return _error(404, "ResourceNotFound", name)
+        return Response(status_code=204)
+
+    @app.get("/indexes('{name}')/docs/$count")
+    async def count(name: str):
+        if name not in indexes:
+            return _error(404, "ResourceNotFound", name)
+        return Response(str(len(indexes[name].docs)), media_type="text/plain")
+
+    @app.post("/indexes('{name}')/docs/search.index")
+    async def index_documents(name: str, request: Request):
+        await _simulate_latency(latency_ms)
+        if name not in indexes:
+            return _error(404, "ResourceNotFound", name)
+        index = indexes[name]
+        results = []
+        for action in (await request.json()).get("value", []):
+            kind = action.pop("@search.action", "upload")
+            key = action.get(index.key)
+            if kind == "delete":
+                index.docs.pop(key, None)
+            elif kind in ("merge", "mergeOrUpload") and key in index.docs:
+                index.docs[key].update(action)
+            else:
+                vec = action.get(index.vector_field)
+                if vec:
+                    norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+                    action["_unit"] = [v / norm for v in vec]
+                index.docs[key] = action
+            results.append({"key": key, "status": True, "errorMessage": None, "statusCode": 201})
+        return {"value": results}
+
+    @app.post("/indexes('{name}')/docs/search.post.search")
+    async def search(name: str, request: Request):
+        await _simulate_latency(latency_ms + (index_latency_ms or {}).get(name, 0.0))
+        if name not in indexes:
+            return _error(404, "ResourceNotFound", name)
+        index = indexes[name]
+        body = await request.json()
+
+        top = body.get("top") or 50
+        vector_queries = body.get("vectorQueries") or []
+        candidates = [d for d in index.docs.values() if _filter_matches(body.get("filter"), d)]
+
+        if vector_queries:
+            query = vector_queries[0]["vector"]
+            norm = math.sqrt(sum(v * v for v in query)) or 1.0
+            query = [v / norm for v in query]
+            top = max(top, vector_queries[0].get("k") or 0)
+            scored = [(sum(a * b for a, b in zip(query, d.get("_unit", ()))), d) for d in candidates]
+        else:
+            terms = set((body.get("search") or "").lower().split()) - {"*"}
+            scored = [(sum(t in str(d.get("content", "")).lower() for t in terms), d) for d in candidates]
+
+        scored.sort(key=lambda x: x[0], reverse=True)
+        # Keyset paging during snapshot export orders by a single field
+        if body.get("orderby"):
+            field, _, direction = body["orderby"].partition(" ")
+            scored.sort(key=lambda x: str(x[1].get(field, "")), reverse=direction.strip() == "desc")
+        select = body.get("select")
+        select = set(select.split(",")) if isinstance(select, str) else None
+
+        value = []
+        for score, doc in scored[:top]:
+            # Vectors are only returned when explicitly selected, as in the real service
+            out = {
+                k: v for k, v in doc.items()
+                if k != "_unit" and (k in select if select is not None else k != index.vector_field)
+            }
+            out["@search.score"] = score
+            value.append(out)
+        return {"value": value}
+
+    return app
+
+
+# =========================
+# SERVING
+# =========================
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class LocalServer:
+    """Runs an ASGI app with uvicorn on a background thread."""
+
+    def __init__(self, app, port: Optional[int] = None):
+        self.port = port or free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.server = uvicorn.Server(
+            uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning")
+        )
+        # Signal handlers can only be installed on the main thread
+        self.server.install_signal_handlers = lambda: None
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def start(self) -> "LocalServer":
+        self.thread.start()
+        while not self.server.started:
+            if not self.thread.is_alive():
+                raise RuntimeError(f"Server on port {self.port} failed to start")
+            time.sleep(0.01)
+        return self
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(timeout=5)
@@ -0,0 +1,309 @@
+"""
+Offline end-to-end benchmark.
+
+Starts local stand-ins for Graph, OpenAI and Azure Search, points rag_app at
+them through environment variables, then:
+
+1. runs ingest() and reports files/s and chunks/s
+2. serves rag_app.api and drives /ask and /ask/secure at the given concurrency,
+   reporting p50/p95/p99 latency and requests/s
+
+Results are written as JSON so runs can be compared for regressions.
+
+Nothing is fetched from the network except tiktoken's encoding, which both the
+token chunker and the embeddings client need. On an offline machine, pre-seed
+TIKTOKEN_CACHE_DIR (or pass --tiktoken-cache-dir); the run stops up front with
+instructions if the encoding is not cached.
+
+Usage:
+    python -m benchmarks.run_benchmark --files 200 --queries 500 --concurrency 16
+    python -m benchmarks.run_benchmark --chat-latency-ms 800 --output results/slow_llm.json
+    python -m benchmarks.run_benchmark --shards 4 --slow-shard-ms 5000   # one stalled shard
+    python -m benchmarks.run_benchmark --tiktoken-cache-dir ~/.cache/tiktoken  # offline
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import jwt
+import requests
+import tiktoken
+from requests.adapters import HTTPAdapter
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.fake_services import (
+    WORDS,
+    GraphFixture,
+    LocalServer,
+    create_graph_app,
+    create_openai_app,
+    create_search_app,
+)
+
+TENANT_ID = "bench-tenant"
+API_CLIENT_ID = "bench-api"
+SIGNING_KID = "bench-key"
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), round(pct / 100 * len(ordered) + 0.5)))
+    return ordered[rank - 1]
+
+
+def latency_summary(latencies: list[float], elapsed: float, errors: int) -> dict:
+    ms = [x * 1000 for x in latencies]
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "requests_per_s": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(ms, 50),
+        "p95_ms": percentile(ms, 95),
+        "p99_ms": percentile(ms, 99),
+        "max_ms": max(ms, default=0.0),
+    }
+
+
+def make_signing_key():
+    """RSA key pair plus the JWKS document the fake Graph app serves."""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(key.public_key()))
+    jwk.update({"kid": SIGNING_KID, "use": "sig", "alg": "RS256"})
+    return key, {"keys": [jwk]}
+
+
+def make_user_token(key, groups: list[str]) -> str:
+    now = int(time.time())
+    claims = {
+        "oid": "bench-user",
+        "name": "Benchmark User",
+        "preferred_username": "bench@example.com",
+        "groups": groups,
+        "aud": API_CLIENT_ID,
+        "iss": f"https://login.microsoftonline.com/{TENANT_ID}/v2.0",
+        "iat": now,
+        "exp": now + 3600,
+    }
+    return jwt.encode(claims, key, algorithm="RS256", headers={"kid": SIGNING_KID})
+
+
+EMBEDDING_MODEL = "text-embedding-3-large"
+
+
+def check_tokenizer(model: str = EMBEDDING_MODEL):
+    """
+    Exit with instructions if tiktoken would have to download the model's encoding.
+
+    tiktoken fetches encodings from openaipublic.blob.core.windows.net on first
+    use and caches them in TIKTOKEN_CACHE_DIR (default: a data-gym-cache
+    directory under the system temp dir).
+    """
+    try:
+        tiktoken.encoding_for_model(model)
+    except Exception as e:
+        cache_dir = os.getenv("TIKTOKEN_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "data-gym-cache")
+        sys.exit(
+            f"Error: tiktoken encoding for {model} is not cached in {cache_dir} and could not be downloaded "
+            f"({type(e).__name__}).\n"
+            "Seed the cache on a machine with network access and copy it over:\n"
+            f"    TIKTOKEN_CACHE_DIR=<dir> python -c \"import tiktoken; tiktoken.encoding_for_model('{model}')\"\n"
+            "then run the benchmark with TIKTOKEN_CACHE_DIR=<dir> or --tiktoken-cache-dir <dir>."
+        )
+
+
+def configure_environment(graph_url: str, openai_url: str, search_url: str, fixtures: list[GraphFixture], index: str):
+    """
+    Point rag_app at the fakes; must run before any rag_app import.
+
+    With more than one fixture, each drive becomes a SHAREPOINT_SOURCES entry
+    ingested into its own index shard.
+    """
+    if len(fixtures) > 1:
+        os.environ["SHAREPOINT_SOURCES"] = json.dumps([
+            {
+                "name": f"shard-{i}",
+                "drive_id": f.drive_id,
+                "folder_id": f.folder_id,
+                "index": f"{index}-{i}",
+            }
+            for i, f in enumerate(fixtures)
+        ])
+
+    fixture = fixtures[0]
+    os.environ.update({
+        "OPENAI_API_KEY": "bench-key",
+        "OPENAI_BASE_URL": f"{openai_url}/v1",
+        "OPENAI_CHAT_MODEL": "gpt-4o",
+        "OPENAI_EMBEDDING_MODEL": EMBEDDING_MODEL,
+        "AZURE_SEARCH_ENDPOINT": search_url,
+        "AZURE_SEARCH_KEY": "bench-key",
+        "AZURE_SEARCH_INDEX": index,
+        "TENANT_ID": TENANT_ID,
+        "CLIENT_ID": API_CLIENT_ID,
+        "CLIENT_SECRET": "bench-secret",
+        "AZURE_AD_API_CLIENT_ID": API_CLIENT_ID,
+        "AZURE_AD_JWKS_URI": f"{graph_url}/discovery/v2.0/keys",
+        "GRAPH_API_BASE": f"{graph_url}/v1.0",
+        "GRAPH_ACCESS_TOKEN": "bench-graph-token",
+        "DRIVE_ID": fixture.drive_id,
+        "FOLDER_ID": fixture.folder_id,
+    })
+
+
+def drive_endpoint(url: str, questions: list[str], concurrency: int, headers: dict) -> dict:
+    """POST every question to url with a fixed-size worker pool."""
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(pool_maxsize=concurrency))
+    latencies: list[float] = []
+    errors = 0
+
+    def call(question):
+        start = time.perf_counter()
+        r = session.post(url, params={"question": question}, headers=headers, timeout=300)
+        return r.ok, time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for ok, latency in pool.map(call, questions):
+            if ok:
+                latencies.append(latency)
+            else:
+                errors += 1
+    return latency_summary(latencies, time.perf_counter() - start, errors)
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=50, help="Files in the fake SharePoint folder(s)")
+    parser.add_argument("--shards", type=int, default=1, help="Libraries, each ingested into its own index")
+    parser.add_argument("--paragraphs", type=int, default=40, help="Paragraphs per generated DOCX")
+    parser.add_argument("--groups", type=int, default=20, help="Distinct ACL groups")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.1, help="Share of files that are copies")
+    parser.add_argument("--queries", type=int, default=200, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients")
+    parser.add_argument("--dimensions", type=int, default=256, help="Fake embedding dimensions")
+    parser.add_argument("--graph-latency-ms", type=float, default=0.0)
+    parser.add_argument("--embed-latency-ms", type=float, default=0.0)
+    parser.add_argument("--chat-latency-ms", type=float, default=0.0)
+    parser.add_argument("--search-latency-ms", type=float, default=0.0)
+    parser.add_argument("--slow-shard-ms", type=float, default=0.0, help="Extra search latency on the last shard")
+    parser.add_argument("--skip-ingest", action="store_true", help="Only benchmark the query endpoints")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the JSON results")
+    parser.add_argument(
+        "--tiktoken-cache-dir",
+        default=os.getenv("TIKTOKEN_CACHE_DIR"),
+        help="Pre-seeded tiktoken cache, for machines without network access",
+    )
+    args = parser.parse_args()
+
+    if args.tiktoken_cache_dir:
+        os.environ["TIKTOKEN_CACHE_DIR"] = os.path.expanduser(args.tiktoken_cache_dir)
+    check_tokenizer()
+
+    signing_key, jwks = make_signing_key()
+    # --files is split across the shards
+    fixtures = [
+        GraphFixture(
+            drive_id=f"bench-drive-{i}",
+            folder_id=f"bench-folder-{i}",
+            files=args.files // args.shards + (i < args.files % args.shards),
+            paragraphs=args.paragraphs,
+            groups=args.groups,
+            duplicate_ratio=args.duplicate_ratio,
+            seed=args.seed * 1000 + i,
+        )
+        for i in range(args.shards)
+    ]
+    index = "bench-index"
+    slow_index = f"{index}-{args.shards - 1}" if args.shards > 1 else index
+
+    openai_app = create_openai_app(args.dimensions, args.embed_latency_ms, args.chat_latency_ms)
+    servers = [
+        LocalServer(create_graph_app(fixtures, args.graph_latency_ms, jwks)).start(),
+        LocalServer(openai_app).start(),
+        LocalServer(create_search_app(args.search_latency_ms, {slow_index: args.slow_shard_ms})).start(),
+    ]
+    graph, openai, search = servers
+    configure_environment(graph.url, openai.url, search.url, fixtures, index=index)
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "config": vars(args),
+    }
+
+    try:
+        if not args.skip_ingest:
+            from rag_app.ingestion import ingest_all
+
+            start = time.perf_counter()
+            summary = ingest_all()
+            elapsed = time.perf_counter() - start
+            results["ingest"] = {
+                **summary,
+                "seconds": elapsed,
+                "files_per_s": summary["files"] / elapsed if elapsed else 0.0,
+                "chunks_per_s": summary["chunks"] / elapsed if elapsed else 0.0,
+            }
+
+        from rag_app.api import app
+
+        api = LocalServer(app).start()
+        servers.append(api)
+
+        rng = random.Random(args.seed)
+        questions = [
+            "What does the " + " ".join(rng.choice(WORDS) for _ in range(4)) + " say?"
+            for _ in range(args.queries)
+        ]
+        groups = fixtures[0].groups
+        token = make_user_token(signing_key, rng.sample(groups, k=min(3, len(groups))))
+
+        results["ask"] = drive_endpoint(f"{api.url}/ask", questions, args.concurrency, {})
+        results["ask_secure"] = drive_endpoint(
+            f"{api.url}/ask/secure", questions, args.concurrency, {"Authorization": f"Bearer {token}"}
+        )
+        results["upstream_calls"] = dict(openai_app.state.calls)
+    finally:
+        for server in reversed(servers):
+            server.stop()
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+
+    if "ingest" in results:
+        r = results["ingest"]
+        print(f"\ningest:      {r['files']} files, {r['chunks']} chunks in {r['seconds']:.2f}s "
+              f"({r['files_per_s']:.1f} files/s, {r['chunks_per_s']:.1f} chunks/s)")
+    for name in ("ask", "ask_secure"):
+        r = results[name]
+        print(f"{name + ':':<12} {r['requests_per_s']:.1f} req/s  p50 {r['p50_ms']:.1f}ms  "
+              f"p95 {r['p95_ms']:.1f}ms  p99 {r['p99_ms']:.1f}ms  errors {r['errors']}")
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Admission Control Module
+
+Caps the number of requests calling the LLM at once and keeps a bounded,
+priority-ordered wait queue in front of it. When the queue is full, or a
+request waits longer than the queue deadline, the request is rejected with
+429 and a Retry-After estimate instead of piling up behind the OpenAI client.
+
+Used from the event loop only (async endpoints). Requests wait for a slot on
+the loop, never in a worker thread, so the queue bound and deadline apply to
+the whole backlog.
+"""
+import asyncio
+import bisect
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import HTTPException, status
+
+from rag_app.config import (
+    ADMISSION_ENABLED,
+    ADMISSION_MAX_IN_FLIGHT,
+    ADMISSION_MAX_QUEUE,
+    ADMISSION_QUEUE_TIMEOUT_S,
+    ADMISSION_PRIORITIZE_AUTHENTICATED,
+)
+from rag_app.metrics import (
+    ADMISSION_IN_FLIGHT,
+    ADMISSION_QUEUE_DEPTH,
+    ADMISSION_REJECTED,
+    ADMISSION_WAIT_SECONDS,
+)
+
+# Lower value = served first
+PRIORITIES = {"authenticated": 0, "anonymous": 1}
+
+
+class _Waiter:
+    def __init__(self, priority: int, seq: int, weight: int, future: asyncio.Future):
+        self.priority = priority
+        self.seq = seq
+        self.weight = weight
+        self.future = future
+
+    def __lt__(self, other: "_Waiter"):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class AdmissionController:
+    """
+    Weighted semaphore with a bounded priority queue and a wait deadline.
+
+    Waiters are served strictly in (priority, arrival) order, so a heavy
+    request at the head of the queue is not starved by lighter ones behind it.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = ADMISSION_MAX_IN_FLIGHT,
+        max_queue: int = ADMISSION_MAX_QUEUE,
+        queue_timeout_s: float = ADMISSION_QUEUE_TIMEOUT_S,
+        prioritize_authenticated: bool = ADMISSION_PRIORITIZE_AUTHENTICATED,
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout_s = queue_timeout_s
+        self.prioritize_authenticated = prioritize_authenticated
+        self.in_flight = 0
+        self._waiters: list[_Waiter] = []
+        self._seq = itertools.count()
+        # Moving average of how long a slot is held, for Retry-After estimates
+        self._avg_hold_s = 1.0
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def _priority(self, priority_class: str) -> int:
+        return PRIORITIES[priority_class] if self.prioritize_authenticated else 0
+
+    def _retry_after(self) -> int:
+        """Seconds until the current queue would likely have drained."""
+        return max(1, math.ceil(self._avg_hold_s * (self.queued + 1) / self.max_in_flight))
+
+    def _reject(self, reason: str, detail: str):
+        ADMISSION_REJECTED.labels(reason).inc()
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=detail,
+            headers={"Retry-After": str(self._retry_after())}
+        )
+
+    def _update_gauges(self):
+        ADMISSION_IN_FLIGHT.set(self.in_flight)
+        ADMISSION_QUEUE_DEPTH.set(self.queued)
+
+    def _grant_waiters(self):
+        while self._waiters and self.in_flight + self._waiters[0].weight <= self.max_in_flight:
+            waiter = self._waiters.pop(0)
+            if waiter.future.done():
+                continue
+            self.in_flight += waiter.weight
+            waiter.future.set_result(None)
+        self._update_gauges()
+
+    async def acquire(self, priority_class: str, weight: int = 1) -> int:
+        """
+        Wait for weight slots; raises 429 if the queue is full or the deadline passes.
+
+        Returns the number of slots acquired, to be passed to release().
+        """
+        weight = max(1, min(weight, self.max_in_flight))
+        start = time.perf_counter()
+
+        if not self._waiters and self.in_flight + weight <= self.max_in_flight:
+            self.in_flight += weight
+            self._update_gauges()
+            ADMISSION_WAIT_SECONDS.labels(priority_class).observe(0.0)
+            return weight
+
+        if self.queued >= self.max_queue:
+            self._reject("queue_full", "Server is busy, please retry later")
+
+        waiter = _Waiter(
+            self._priority(priority_class),
+            next(self._seq),
+            weight,
+            asyncio.get_running_loop().create_future(),
+        )
+        bisect.insort(self._waiters, waiter)
+        self._update_gauges()
+
+        try:
+            await asyncio.wait_for(waiter.future, timeout=self.queue_timeout_s)
+        except asyncio.TimeoutError:
+            # The slots may have been granted in the same loop turn the deadline fired
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.release(weight, 0.0)
+            else:
+                self._remove(waiter)
+            self._reject("timeout", "Timed out waiting for capacity, please retry later")
+        except asyncio.CancelledError:
+            # Client went away; give back the slots if they were granted meanwhile
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.release(weight, 0.0)
+            else:
+                self._remove(waiter)
+            raise
+
+        ADMISSION_WAIT_SECONDS.labels(priority_class).observe(time.perf_counter() - start)
+        return weight
+
+    def _remove(self, waiter: _Waiter):
+        if waiter in self._waiters:
+            self._waiters.remove(waiter)
+        # A waiter leaving the head may unblock smaller ones behind it
+        self._grant_waiters()
+
+    def release(self, weight: int, held_s: float):
+        self.in_flight -= weight
+        if held_s:
+            self._avg_hold_s = 0.9 * self._avg_hold_s + 0.1 * held_s
+        self._grant_waiters()
+
+    @asynccontextmanager
+    async def slot(self, priority_class: str, weight: int = 1):
+        """Hold weight slots for the duration of the block."""
+        if not ADMISSION_ENABLED:
+            yield
+            return
+
+        weight = await self.acquire(priority_class, weight)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(weight, time.perf_counter() - start)
+
+
+admission = AdmissionController()
@@ -4,12 +4,24 @@ FastAPI Application
 Provides both authenticated and unauthenticated endpoints for RAG queries.
 The secure endpoint applies document-level security based on Azure AD groups.
 """
+import time
+from functools import partial
 from typing import Optional
-from fastapi import FastAPI, Depends, Query
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from pydantic import BaseModel
 
-from rag_app.rag_chain import rag_chain, invoke_secure
+from rag_app.rag_chain import ainvoke_secure, abatch_secure
 from rag_app.auth import get_current_user, require_auth, User
+from rag_app.config import BATCH_MAX_QUESTIONS, BATCH_CONCURRENCY
+from rag_app.admission import admission
+from rag_app.metrics import (
+    IN_FLIGHT,
+    REQUEST_SECONDS,
+    start_request_timings,
+    server_timing_header,
+)
 
 app = FastAPI(
     title="SharePoint RAG API",
@@ -24,26 +36,65 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
 
+@app.middleware("http")
+async def instrument_requests(request: Request, call_next):
+    """
+    Record per-endpoint latency and in-flight requests, and return the
+    per-stage timings (auth, embed, retrieve, llm, total) as a Server-Timing header.
+    """
+    if request.url.path == "/metrics":
+        return await call_next(request)
+
+    # Only label known routes so arbitrary paths don't create new series
+    endpoint = request.url.path
+    if endpoint not in {route.path for route in app.routes}:
+        endpoint = "unmatched"
+
+    timings = start_request_timings()
+    in_flight = IN_FLIGHT.labels(endpoint)
+    in_flight.inc()
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    except Exception:
+        # Unhandled errors become a 500 outside this middleware, so no header
+        # can be added; record the request and log its stages instead
+        timings["total"] = time.perf_counter() - start
+        REQUEST_SECONDS.labels(endpoint, "500").observe(timings["total"])
+        print(f"Error: {request.method} {endpoint} failed; Server-Timing: {server_timing_header(timings)}")
+        raise
+    finally:
+        in_flight.dec()
+    timings["total"] = time.perf_counter() - start
+    REQUEST_SECONDS.labels(endpoint, str(response.status_code)).observe(timings["total"])
+
+    response.headers["Server-Timing"] = server_timing_header(timings)
+    return response
+
+
 @app.post("/ask")
-def ask(question: str = Query(..., description="Your question about the documents")):
+async def ask(question: str = Query(..., description="Your question about the documents")):
     """
     Query documents without authentication (backward compatible).
     
     WARNING: This endpoint does NOT apply permission filtering.
     All indexed documents are searchable.
     """
+    # Admission and coalescing happen on the event loop; only the caller that
+    # actually runs the chain takes an LLM slot and a worker thread
     return {
-        "answer": rag_chain.invoke(question),
+        "answer": await ainvoke_secure(question, slot=partial(admission.slot, "anonymous")),
         "authenticated": False,
         "warning": "No permission filtering applied"
     }
 
 
 @app.post("/ask/secure")
-def ask_secure(
+async def ask_secure(
     question: str = Query(..., description="Your question about the documents"),
     user: User = Depends(require_auth)
 ):
@@ -56,7 +107,9 @@ def ask_secure(
     Requires: Bearer token from Azure AD in Authorization header.
     """
     # Use the user's principals (user ID + group IDs) for security filtering
-    answer = invoke_secure(question, user.all_principals)
+    answer = await ainvoke_secure(
+        question, user.all_principals, slot=partial(admission.slot, "authenticated")
+    )
     
     return {
         "answer": answer,
@@ -70,8 +123,71 @@ def ask_secure(
     }
 
 
+class BatchQuestions(BaseModel):
+    questions: list[str]
+
+
+def _validate_batch(batch: BatchQuestions):
+    if not batch.questions:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="At least one question is required"
+        )
+    if len(batch.questions) > BATCH_MAX_QUESTIONS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {BATCH_MAX_QUESTIONS} questions per batch"
+        )
+
+
+@app.post("/ask/batch")
+async def ask_batch(batch: BatchQuestions):
+    """
+    Answer many questions in one request without authentication.
+
+    All questions are embedded in a single call, retrieved concurrently and
+    answered with a concurrency cap. Each item has either an answer or an error.
+
+    WARNING: This endpoint does NOT apply permission filtering.
+    """
+    _validate_batch(batch)
+    # A batch runs up to BATCH_CONCURRENCY LLM calls, so it holds that many slots
+    async with admission.slot("anonymous", weight=min(len(batch.questions), BATCH_CONCURRENCY)):
+        result = await abatch_secure(batch.questions)
+    return {
+        **result,
+        "authenticated": False,
+        "warning": "No permission filtering applied"
+    }
+
+
+@app.post("/ask/batch/secure")
+async def ask_batch_secure(batch: BatchQuestions, user: User = Depends(require_auth)):
+    """
+    Answer many questions with Azure AD authentication and permission filtering.
+
+    The token is validated once for the whole batch; every retrieval is
+    filtered to documents the user has access to.
+
+    Requires: Bearer token from Azure AD in Authorization header.
+    """
+    _validate_batch(batch)
+    async with admission.slot("authenticated", weight=min(len(batch.questions), BATCH_CONCURRENCY)):
+        result = await abatch_secure(batch.questions, user.all_principals, secure=True)
+    return {
+        **result,
+        "authenticated": True,
+        "user": {
+            "id": user.user_id,
+            "email": user.email,
+            "name": user.name,
+            "groups_count": len(user.groups)
+        }
+    }
+
+
 @app.get("/me")
-def get_me(user: User = Depends(require_auth)):
+async def get_me(user: User = Depends(require_auth)):
     """
     Get information about the authenticated user.
     Useful for testing authentication setup.
@@ -85,8 +201,23 @@ def get_me(user: User = Depends(require_auth)):
     }
 
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.get("/health")
-def health():
+async def health():
     """Health check endpoint."""
-    return {"status": "healthy", "version": "2.0.0"}
+    return {
+        "status": "healthy",
+        "version": "2.0.0",
+        "admission": {
+            "in_flight": admission.in_flight,
+            "queued": admission.queued,
+            "max_in_flight": admission.max_in_flight,
+            "max_queue": admission.max_queue
+        }
+    }
 
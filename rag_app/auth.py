@@ -13,10 +13,14 @@ from jwt import PyJWKClient
 from functools import lru_cache
 
 from rag_app.config import TENANT_ID
+from rag_app.metrics import timed_stage, record_cache
 
 # Azure AD configuration
 AZURE_AD_AUTHORITY = f"https://login.microsoftonline.com/{TENANT_ID}"
-AZURE_AD_JWKS_URI = f"https://login.microsoftonline.com/{TENANT_ID}/discovery/v2.0/keys"
+AZURE_AD_JWKS_URI = os.getenv(
+    "AZURE_AD_JWKS_URI",
+    f"https://login.microsoftonline.com/{TENANT_ID}/discovery/v2.0/keys"
+)
 
 # Expected audience - should be your API's Application ID URI or client ID
 AZURE_AD_AUDIENCE = os.getenv("AZURE_AD_API_CLIENT_ID", os.getenv("CLIENT_ID"))
@@ -56,8 +60,15 @@ def decode_token(token: str) -> dict:
     - Audience (this API)
     - Expiration
     """
+    with timed_stage("auth"):
+        return _decode_token(token)
+
+
+def _decode_token(token: str) -> dict:
     try:
         jwks_client = get_jwks_client()
+        jwk_set_cache = getattr(jwks_client, "jwk_set_cache", None)
+        record_cache("jwks", jwk_set_cache is not None and jwk_set_cache.get() is not None)
         signing_key = jwks_client.get_signing_key_from_jwt(token)
         
         decoded = jwt.decode(
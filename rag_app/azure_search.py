@@ -1,56 +1,19 @@
-from azure.core.credentials import AzureKeyCredential
+from functools import lru_cache
+
 from langchain_community.vectorstores.azuresearch import AzureSearch
-from azure.search.documents.indexes.models import (
-    SearchableField,
-    SearchField,
-    SearchFieldDataType,
-    SimpleField,
-)
 from rag_app.config import *
-from rag_app.embeddings import embeddings
+from rag_app.embeddings import embeddings, embed_query
+from rag_app.search_index import build_fields, open_vector_store
 
 # Define index schema with security field
-fields = [
-    SimpleField(
-        name="id",
-        type=SearchFieldDataType.String,
-        key=True,
-        filterable=True,
-    ),
-    SearchableField(
-        name="content",
-        type=SearchFieldDataType.String,
-        searchable=True,
-    ),
-    SearchField(
-        name="content_vector",
-        type=SearchFieldDataType.Collection(SearchFieldDataType.Single),
-        searchable=True,
-        vector_search_dimensions=len(embeddings.embed_query("Text")),
-        vector_search_profile_name="myHnswProfile",
-    ),
-    SearchableField(
-        name="metadata",
-        type=SearchFieldDataType.String,
-        searchable=True,
-    ),
-    # Field for storing allowed group/user IDs for security filtering
-    SimpleField(
-        name="allowed_groups",
-        type=SearchFieldDataType.Collection(SearchFieldDataType.String),
-        filterable=True,
-    ),
-    SimpleField(
-        name="source",
-        type=SearchFieldDataType.String,
-        filterable=True,
-    ),
-]
+fields = build_fields(EMBEDDING_DIMENSIONS or len(embeddings.embed_query("Text")))
+
+
+@lru_cache(maxsize=None)
+def get_vector_store(index_name: str) -> AzureSearch:
+    """Vector store for one index (shard); creates the index from `fields` if missing."""
+    return open_vector_store(index_name, fields, embed_query)
+
 
-vector_store = AzureSearch(
-    azure_search_endpoint=AZURE_SEARCH_ENDPOINT,
-    azure_search_key=AZURE_SEARCH_KEY,
-    index_name=AZURE_SEARCH_INDEX,
-    embedding_function=embeddings.embed_query,
-    fields=fields
-)
+# Primary index; the only one unless SHAREPOINT_SOURCES defines several shards
+vector_store = get_vector_store(SEARCH_INDEXES[0])
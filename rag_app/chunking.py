@@ -1,5 +1,24 @@
+"""
+Chunking Module
+
+Two strategies are available:
+- "characters": the original RecursiveCharacterTextSplitter(1000, 200) over one string.
+- "tokens": packs parser segments (pages, slides, sheets) into chunks measured in
+  tiktoken tokens. Segments are consumed lazily, so the full file text is never held.
+"""
+from functools import lru_cache
+from typing import Iterable, Iterator
+
+import tiktoken
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
+from rag_app.config import (
+    CHUNK_STRATEGY,
+    CHUNK_TOKENS,
+    CHUNK_OVERLAP_TOKENS,
+    OPENAI_EMBEDDING_MODEL,
+)
+
 
 splitter = RecursiveCharacterTextSplitter(
     chunk_size=1000,
@@ -8,3 +27,96 @@ splitter = RecursiveCharacterTextSplitter(
 
 def chunk_text(text):
     return splitter.split_text(text)
+
+
+@lru_cache(maxsize=1)
+def get_encoding():
+    """Get the cached tiktoken encoding used by the embedding model."""
+    try:
+        return tiktoken.encoding_for_model(OPENAI_EMBEDDING_MODEL or "")
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str) -> int:
+    """Number of embedding-model tokens in text."""
+    return len(get_encoding().encode(text, disallowed_special=()))
+
+
+@lru_cache(maxsize=4)
+def get_token_splitter(chunk_tokens: int, overlap_tokens: int) -> RecursiveCharacterTextSplitter:
+    """Splitter for segments that are larger than one chunk on their own."""
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_tokens,
+        chunk_overlap=overlap_tokens,
+        length_function=count_tokens,
+    )
+
+
+def chunk_segments_by_tokens(
+    segments: Iterable[str],
+    chunk_tokens: int = CHUNK_TOKENS,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+) -> Iterator[str]:
+    """
+    Pack segments into chunks of at most chunk_tokens tokens.
+
+    Consecutive small segments are joined until the next one would not fit, so
+    chunks always start and end on a segment boundary. A segment that is larger
+    than a chunk by itself is split on paragraph/line/word boundaries with
+    overlap_tokens of overlap.
+
+    Args:
+        segments: Iterator of text segments (one per page, slide, sheet...)
+        chunk_tokens: Maximum chunk size in tokens
+        overlap_tokens: Overlap between pieces of an oversized segment
+
+    Yields:
+        Chunk strings
+    """
+    buffer: list[str] = []
+    buffer_tokens = 0
+
+    for segment in segments:
+        segment = segment.strip()
+        if not segment:
+            continue
+
+        n_tokens = count_tokens(segment)
+
+        # +1 accounts for the newline joining the segment to the buffer
+        if buffer and buffer_tokens + 1 + n_tokens > chunk_tokens:
+            yield "\n".join(buffer)
+            buffer, buffer_tokens = [], 0
+
+        if n_tokens > chunk_tokens:
+            yield from get_token_splitter(chunk_tokens, overlap_tokens).split_text(segment)
+            continue
+
+        if buffer:
+            buffer_tokens += 1
+        buffer.append(segment)
+        buffer_tokens += n_tokens
+
+    if buffer:
+        yield "\n".join(buffer)
+
+
+def chunk_segments(segments: Iterable[str], strategy: str = CHUNK_STRATEGY) -> Iterator[str]:
+    """
+    Chunk parser segments with the configured strategy.
+
+    Args:
+        segments: Iterator of text segments from document_parser.iter_segments
+        strategy: "tokens" or "characters"
+
+    Yields:
+        Chunk strings
+    """
+    if strategy == "characters":
+        # Legacy behaviour: one whole-file string through the character splitter
+        yield from chunk_text("\n".join(segments))
+    elif strategy == "tokens":
+        yield from chunk_segments_by_tokens(segments)
+    else:
+        raise ValueError(f"Unknown chunking strategy: {strategy}")
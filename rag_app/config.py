@@ -1,4 +1,6 @@
 import os
+import json
+import re
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -7,6 +9,10 @@ load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_CHAT_MODEL = os.getenv("OPENAI_CHAT_MODEL")
 OPENAI_EMBEDDING_MODEL = os.getenv("OPENAI_EMBEDDING_MODEL")
+# Optional override, e.g. to point at a local stand-in server
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
+# Embedding vector size; probed from the model with one embedding call when unset
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS")) if os.getenv("EMBEDDING_DIMENSIONS") else None
 
 # Azure Search
 AZURE_SEARCH_ENDPOINT = os.getenv("AZURE_SEARCH_ENDPOINT")
@@ -20,3 +26,108 @@ CLIENT_SECRET = os.getenv("CLIENT_SECRET")
 SITE_ID = os.getenv("SITE_ID")
 DRIVE_ID = os.getenv("DRIVE_ID")
 FOLDER_ID = os.getenv("FOLDER_ID")
+
+# Microsoft Graph endpoint; override to point at a local stand-in server
+GRAPH_API_BASE = os.getenv("GRAPH_API_BASE", "https://graph.microsoft.com/v1.0")
+# Pre-acquired Graph token; when set, MSAL client-credential flow is skipped
+GRAPH_ACCESS_TOKEN = os.getenv("GRAPH_ACCESS_TOKEN")
+
+# Chunking
+# "tokens" packs parser segments (pages/slides/sheets) into tiktoken-sized chunks;
+# "characters" keeps the original 1000/200 character splitter.
+CHUNK_STRATEGY = os.getenv("CHUNK_STRATEGY", "tokens")
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "512"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "64"))
+
+# Near-duplicate detection (MinHash/LSH) before embedding
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.9"))
+DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", "128"))
+DEDUP_SHINGLE_SIZE = int(os.getenv("DEDUP_SHINGLE_SIZE", "5"))
+
+# Metrics: optional Prometheus Pushgateway for batch (ingestion) runs
+PROMETHEUS_PUSHGATEWAY = os.getenv("PROMETHEUS_PUSHGATEWAY")
+
+# Share one retrieval + generation between identical concurrent questions
+COALESCE_QUESTIONS = os.getenv("COALESCE_QUESTIONS", "true").lower() == "true"
+
+# Batch question endpoints
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", "100"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+# Admission control in front of the LLM
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "16"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+ADMISSION_QUEUE_TIMEOUT_S = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_S", "10"))
+ADMISSION_PRIORITIZE_AUTHENTICATED = os.getenv("ADMISSION_PRIORITIZE_AUTHENTICATED", "true").lower() == "true"
+
+# Downloads: files over MAX_FILE_SIZE_MB are skipped before download; files over
+# RANGED_DOWNLOAD_THRESHOLD_MB are fetched as parallel HTTP Range requests
+MAX_FILE_SIZE_MB = float(os.getenv("MAX_FILE_SIZE_MB", "200"))
+RANGED_DOWNLOAD_THRESHOLD_MB = float(os.getenv("RANGED_DOWNLOAD_THRESHOLD_MB", "32"))
+DOWNLOAD_PART_SIZE_MB = float(os.getenv("DOWNLOAD_PART_SIZE_MB", "8"))
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", "4"))
+
+# Multi-library ingestion. Each source is one SharePoint library/folder ingested
+# into its own index (shard):
+#   [{"name": "hr", "drive_id": "...", "folder_id": "...", "index": "rag-hr"}, ...]
+# drive_id and folder_id are required; name defaults to drive_id and index to
+# AZURE_SEARCH_INDEX-<name>, normalized to a valid index name. Set inline in
+# SHAREPOINT_SOURCES or as a JSON file in SHAREPOINT_SOURCES_FILE. Defaults to
+# the single DRIVE_ID/FOLDER_ID library in AZURE_SEARCH_INDEX.
+
+# Azure AI Search: lowercase letters, digits and dashes, starting and ending
+# with a letter or digit, at most 128 characters
+_INDEX_NAME_RE = re.compile(r"[a-z0-9](?:[a-z0-9-]{0,126}[a-z0-9])?")
+
+
+def _index_name(value: str) -> str:
+    """Turn e.g. "sharepoint-rag-b!Xb4m_Q" into a valid index name."""
+    name = re.sub(r"[^a-z0-9]+", "-", value.lower()).strip("-")
+    return name[:128].rstrip("-")
+
+
+def _load_sources():
+    raw = os.getenv("SHAREPOINT_SOURCES")
+    if not raw and os.getenv("SHAREPOINT_SOURCES_FILE"):
+        with open(os.getenv("SHAREPOINT_SOURCES_FILE")) as f:
+            raw = f.read()
+    if not raw:
+        return [{
+            "name": "default",
+            "drive_id": DRIVE_ID,
+            "folder_id": FOLDER_ID,
+            "index": AZURE_SEARCH_INDEX,
+        }]
+
+    try:
+        sources = json.loads(raw)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"SHAREPOINT_SOURCES is not valid JSON: {e}") from e
+    if not isinstance(sources, list) or not sources:
+        raise ValueError("SHAREPOINT_SOURCES must be a non-empty JSON list of sources")
+
+    for i, source in enumerate(sources):
+        if not isinstance(source, dict):
+            raise ValueError(f"SHAREPOINT_SOURCES entry {i} must be an object, got {source!r}")
+        missing = [key for key in ("drive_id", "folder_id") if not source.get(key)]
+        if missing:
+            raise ValueError(
+                f"SHAREPOINT_SOURCES entry {source.get('name', i)!r} is missing {', '.join(missing)}"
+            )
+        source.setdefault("name", source["drive_id"])
+        source.setdefault("index", _index_name(f"{AZURE_SEARCH_INDEX}-{source['name']}"))
+        if not isinstance(source["index"], str) or not _INDEX_NAME_RE.fullmatch(source["index"]):
+            raise ValueError(
+                f"SHAREPOINT_SOURCES entry {source['name']!r} has invalid index name {source['index']!r}: "
+                "use at most 128 lowercase letters, digits and dashes, starting and ending with a letter or digit"
+            )
+    return sources
+
+
+SHAREPOINT_SOURCES = _load_sources()
+# Indexes queried by the API; more than one enables sharded fan-out search
+SEARCH_INDEXES = list(dict.fromkeys(s["index"] for s in SHAREPOINT_SOURCES))
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "4"))
+SHARD_TIMEOUT_S = float(os.getenv("SHARD_TIMEOUT_S", "2"))
@@ -0,0 +1,137 @@
+"""
+Near-Duplicate Detection Module
+
+Fingerprints chunks with MinHash and uses LSH to find near-duplicates before
+embedding. Each group of duplicates is folded into one document whose
+allowed_groups is the union of every copy's ACL, so nobody loses access to
+content they could see in any of the copies.
+"""
+import hashlib
+import re
+
+from datasketch import MinHash, MinHashLSH
+from langchain_core.documents import Document
+
+from rag_app.config import DEDUP_THRESHOLD, DEDUP_NUM_PERM, DEDUP_SHINGLE_SIZE
+
+_WORD_RE = re.compile(r"\w+")
+
+
+class DedupStats:
+    """Counts reported after a dedup pass."""
+
+    def __init__(self):
+        self.total = 0
+        self.exact_duplicates = 0
+        self.near_duplicates = 0
+
+    @property
+    def duplicates(self) -> int:
+        return self.exact_duplicates + self.near_duplicates
+
+    @property
+    def unique(self) -> int:
+        return self.total - self.duplicates
+
+    @property
+    def ratio(self) -> float:
+        """Fraction of chunks removed as duplicates."""
+        return self.duplicates / self.total if self.total else 0.0
+
+    def __str__(self):
+        return (
+            f"{self.total} chunks -> {self.unique} unique "
+            f"({self.exact_duplicates} exact, {self.near_duplicates} near duplicates, "
+            f"{self.ratio:.1%} removed)"
+        )
+
+
+def _normalize(text: str) -> list[str]:
+    return _WORD_RE.findall(text.lower())
+
+
+def minhash(words: list[str], num_perm: int = DEDUP_NUM_PERM, shingle_size: int = DEDUP_SHINGLE_SIZE) -> MinHash:
+    """MinHash signature over word shingles."""
+    m = MinHash(num_perm=num_perm)
+    if len(words) <= shingle_size:
+        shingles = [" ".join(words)]
+    else:
+        shingles = (" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1))
+    m.update_batch([s.encode("utf-8") for s in shingles])
+    return m
+
+
+def _merge_into(canonical: Document, duplicate: Document):
+    """Fold a duplicate's ACL and source into the canonical document."""
+    meta = canonical.metadata
+    dup_meta = duplicate.metadata
+
+    meta["allowed_groups"] = sorted(
+        set(meta.get("allowed_groups", [])) | set(dup_meta.get("allowed_groups", []))
+    )
+
+    dup_source = dup_meta.get("source")
+    if dup_source and dup_source != meta.get("source"):
+        sources = meta.setdefault("duplicate_sources", [])
+        if dup_source not in sources:
+            sources.append(dup_source)
+
+
+def dedup_documents(
+    docs: list[Document],
+    threshold: float = DEDUP_THRESHOLD,
+    num_perm: int = DEDUP_NUM_PERM,
+) -> tuple[list[Document], DedupStats]:
+    """
+    Remove exact and near-duplicate chunks, unioning their ACLs.
+
+    Exact copies (same normalized words) are caught with a hash before any
+    MinHash work. Remaining chunks are queried against an LSH index and a
+    candidate only counts as a duplicate if its estimated Jaccard similarity
+    is at least threshold.
+
+    Args:
+        docs: Chunk documents with allowed_groups/source metadata
+        threshold: Jaccard similarity at which two chunks are duplicates
+        num_perm: Number of MinHash permutations
+
+    Returns:
+        (unique documents in original order, stats)
+    """
+    stats = DedupStats()
+    lsh = MinHashLSH(threshold=threshold, num_perm=num_perm)
+    exact: dict[bytes, int] = {}
+    signatures: list[MinHash] = []
+    kept: list[Document] = []
+
+    for doc in docs:
+        stats.total += 1
+        words = _normalize(doc.page_content)
+
+        digest = hashlib.blake2b(" ".join(words).encode("utf-8"), digest_size=16).digest()
+        if digest in exact:
+            _merge_into(kept[exact[digest]], doc)
+            stats.exact_duplicates += 1
+            continue
+
+        m = minhash(words, num_perm=num_perm)
+        match = None
+        for key in lsh.query(m):
+            idx = int(key)
+            if signatures[idx].jaccard(m) >= threshold:
+                match = idx
+                break
+
+        if match is not None:
+            _merge_into(kept[match], doc)
+            exact[digest] = match
+            stats.near_duplicates += 1
+            continue
+
+        idx = len(kept)
+        lsh.insert(str(idx), m)
+        signatures.append(m)
+        exact[digest] = idx
+        kept.append(doc)
+
+    return kept, stats
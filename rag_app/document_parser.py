@@ -1,29 +1,92 @@
+import os
+from typing import Iterator, Optional
+
 from pypdf import PdfReader
 from docx import Document
 from pptx import Presentation
 import openpyxl
 
-def extract_text(path):
-    if path.endswith(".pdf"):
-        return "\n".join(p.extract_text() or "" for p in PdfReader(path).pages)
+from rag_app.chunking import count_tokens
+from rag_app.config import CHUNK_TOKENS
+
+# Formats iter_segments can parse, by extension and by Graph's file.mimeType
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".pptx", ".xlsx")
+SUPPORTED_MIME_TYPES = {
+    "application/pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    # Reported for some uploads regardless of content
+    "application/octet-stream",
+}
+
+
+def file_extension(path) -> str:
+    return os.path.splitext(path)[1].lower()
+
+
+def is_supported(name: str, mime_type: Optional[str] = None) -> bool:
+    """Whether a file can be parsed, judged from listing metadata alone."""
+    if file_extension(name) not in SUPPORTED_EXTENSIONS:
+        return False
+    return mime_type is None or mime_type in SUPPORTED_MIME_TYPES
+
+
+def _iter_sheet_blocks(sheet, block_tokens: int) -> Iterator[str]:
+    """Yield a worksheet's non-empty rows in blocks of about block_tokens tokens."""
+    rows: list[str] = []
+    tokens = 0
+    for row in sheet.iter_rows(values_only=True):
+        line = " ".join(str(c) for c in row if c)
+        if not line:
+            continue
+        # +1 for the joining newline
+        n_tokens = count_tokens(line) + 1
+        if rows and tokens + n_tokens > block_tokens:
+            yield "\n".join(rows)
+            rows, tokens = [], 0
+        rows.append(line)
+        tokens += n_tokens
+    if rows:
+        yield "\n".join(rows)
 
-    if path.endswith(".docx"):
+
+def iter_segments(path, block_tokens: int = CHUNK_TOKENS) -> Iterator[str]:
+    """
+    Yield a file's text one structural unit at a time.
+
+    PDF pages and PPTX slides are each one segment; DOCX yields one segment per
+    paragraph. XLSX sheets are yielded as blocks of rows of about block_tokens
+    tokens that never span two sheets, so a large sheet is never held as one
+    string. Unsupported formats yield nothing.
+    """
+    ext = file_extension(path)
+
+    if ext == ".pdf":
+        for page in PdfReader(path).pages:
+            yield page.extract_text() or ""
+
+    elif ext == ".docx":
         doc = Document(path)
-        return "\n".join(p.text for p in doc.paragraphs)
+        for p in doc.paragraphs:
+            yield p.text
 
-    if path.endswith(".pptx"):
+    elif ext == ".pptx":
         prs = Presentation(path)
-        return "\n".join(
-            shape.text for slide in prs.slides
-            for shape in slide.shapes if hasattr(shape, "text")
-        )
-
-    if path.endswith(".xlsx"):
-        wb = openpyxl.load_workbook(path)
-        text = ""
-        for sheet in wb:
-            for row in sheet.iter_rows(values_only=True):
-                text += " ".join(str(c) for c in row if c) + "\n"
-        return text
-
-    return ""
+        for slide in prs.slides:
+            yield "\n".join(
+                shape.text for shape in slide.shapes if hasattr(shape, "text")
+            )
+
+    elif ext == ".xlsx":
+        # read_only streams rows instead of loading every cell up front
+        wb = openpyxl.load_workbook(path, read_only=True)
+        try:
+            for sheet in wb:
+                yield from _iter_sheet_blocks(sheet, block_tokens)
+        finally:
+            wb.close()
+
+
+def extract_text(path):
+    return "\n".join(iter_segments(path))
@@ -1,7 +1,15 @@
 from langchain_openai import OpenAIEmbeddings
 from rag_app.config import *
+from rag_app.metrics import timed_stage
 
 embeddings = OpenAIEmbeddings(
     api_key=OPENAI_API_KEY,
-    model=OPENAI_EMBEDDING_MODEL
+    model=OPENAI_EMBEDDING_MODEL,
+    base_url=OPENAI_BASE_URL
 )
+
+
+def embed_query(text: str) -> list[float]:
+    """Embed a single query, recording the "embed" stage latency."""
+    with timed_stage("embed"):
+        return embeddings.embed_query(text)
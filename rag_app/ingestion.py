@@ -1,51 +1,166 @@
+from concurrent.futures import ThreadPoolExecutor
+
 from langchain_core.documents import Document
 from rag_app.sharepoint_loader import list_files, download_file, get_file_permissions
-from rag_app.document_parser import extract_text
-from rag_app.chunking import chunk_text
-from rag_app.azure_search import vector_store
+from rag_app.document_parser import iter_segments, is_supported
+from rag_app.chunking import chunk_segments
+from rag_app.dedup import dedup_documents
+from rag_app.azure_search import get_vector_store
+from rag_app.config import DEDUP_ENABLED, MAX_FILE_SIZE_MB, SHAREPOINT_SOURCES, INGEST_WORKERS
+from rag_app.metrics import INGEST_ITEMS, timed_ingest_stage, push_ingest_metrics
 
-def ingest():
+def skip_reason(item):
+    """
+    Reason not to download a listed file, from its listing metadata alone
+    (extension, MIME type, size), or None if it should be ingested.
+    """
+    mime_type = item["file"].get("mimeType")
+    if not is_supported(item["name"], mime_type):
+        return f"unsupported format ({mime_type or 'unknown type'})"
+
+    size = item.get("size") or 0
+    if size > MAX_FILE_SIZE_MB * 1024 * 1024:
+        return f"too large ({size / 1024 / 1024:.0f} MB > {MAX_FILE_SIZE_MB:.0f} MB)"
+
+    return None
+
+
+def ingest(source=None, push_metrics=True):
     """
     Ingest documents from SharePoint into Azure Search.
     Now includes fetching and storing document permissions for security filtering.
+
+    source is one SHAREPOINT_SOURCES entry (library + target index); defaults
+    to the first configured source.
+
+    Each stage (list, download, permissions, parse_chunk, dedup, index) is timed
+    into Prometheus metrics, pushed to PROMETHEUS_PUSHGATEWAY when configured.
+
+    Files are filtered on extension, MIME type and MAX_FILE_SIZE_MB before download.
+
+    Returns a summary with the number of files processed and skipped, chunks
+    indexed and seconds spent per stage.
     """
     docs = []
     total_files = 0
+    skipped_files = 0
+    stage_seconds = {}
+    source = source or SHAREPOINT_SOURCES[0]
+    drive_id = source["drive_id"]
+    # Prefix output with the source name when several libraries run concurrently
+    log = f"[{source['name']}] " if len(SHAREPOINT_SOURCES) > 1 else ""
     
-    print("Starting permission-aware ingestion...")
+    print(f"{log}Starting permission-aware ingestion into {source['index']}...")
 
-    for f in list_files():
+    with timed_ingest_stage("list", stage_seconds):
+        files = list_files(drive_id, source["folder_id"])
+
+    for f in files:
         if "file" not in f:
             continue
         
-        total_files += 1
         file_id = f["id"]
         file_name = f["name"]
-        
-        print(f"Processing: {file_name}")
 
-        # Download and extract text
-        path = download_file(file_id, file_name)
-        text = extract_text(path)
+        # Don't spend bandwidth on files the parser can't use
+        reason = skip_reason(f)
+        if reason:
+            print(f"{log}Skipping: {file_name} - {reason}")
+            skipped_files += 1
+            continue
+
+        total_files += 1
+        print(f"{log}Processing: {file_name}")
+
+        # Download the file; text is streamed page/slide/sheet at a time
+        with timed_ingest_stage("download", stage_seconds):
+            path = download_file(
+                file_id, file_name, f.get("size"), f.get("@microsoft.graph.downloadUrl"), drive_id
+            )
         
         # Fetch permissions for security filtering
-        allowed_principals = get_file_permissions(file_id)
-        print(f"  - Found {len(allowed_principals)} allowed principals")
+        with timed_ingest_stage("permissions", stage_seconds):
+            allowed_principals = get_file_permissions(file_id, drive_id)
+        print(f"{log}  - Found {len(allowed_principals)} allowed principals")
 
         # Chunk and create documents with permission metadata
-        for chunk in chunk_text(text):
-            docs.append(
-                Document(
-                    page_content=chunk,
-                    metadata={
-                        "source": file_name,
-                        "file_id": file_id,
-                        "allowed_groups": allowed_principals  # For security filtering
-                    }
+        with timed_ingest_stage("parse_chunk", stage_seconds):
+            for chunk in chunk_segments(iter_segments(path)):
+                docs.append(
+                    Document(
+                        page_content=chunk,
+                        metadata={
+                            "source": file_name,
+                            "file_id": file_id,
+                            "allowed_groups": allowed_principals  # For security filtering
+                        }
+                    )
                 )
-            )
     
-    print(f"\nIngesting {len(docs)} chunks from {total_files} files...")
-    vector_store.add_documents(docs)
-    print("Ingestion complete!")
+    INGEST_ITEMS.labels("files").inc(total_files)
+    INGEST_ITEMS.labels("skipped_files").inc(skipped_files)
+    INGEST_ITEMS.labels("chunks").inc(len(docs))
+
+    # Fold near-duplicate chunks (copied files, repeated tabs) into one indexed
+    # chunk whose allowed_groups is the union of all copies' ACLs
+    if DEDUP_ENABLED:
+        with timed_ingest_stage("dedup", stage_seconds):
+            docs, dedup_stats = dedup_documents(docs)
+        INGEST_ITEMS.labels("duplicates").inc(dedup_stats.duplicates)
+        print(f"\n{log}Dedup: {dedup_stats}")
+
+    print(f"\n{log}Ingesting {len(docs)} chunks from {total_files} files ({skipped_files} skipped)...")
+    with timed_ingest_stage("index", stage_seconds):
+        get_vector_store(source["index"]).add_documents(docs)
+    INGEST_ITEMS.labels("indexed_chunks").inc(len(docs))
+    print(f"{log}Ingestion complete!")
+
+    print(f"\n{log}Stage timings:")
+    for stage, seconds in stage_seconds.items():
+        print(f"{log}  {stage:<12} {seconds:8.2f}s")
+    if push_metrics:
+        push_ingest_metrics()
+
+    return {
+        "files": total_files,
+        "skipped_files": skipped_files,
+        "chunks": len(docs),
+        "stage_seconds": stage_seconds,
+    }
+
+
+def ingest_all(sources=None, workers=INGEST_WORKERS):
+    """
+    Ingest every configured library concurrently, each into its own index.
+
+    A failing source is reported and does not stop the others.
+
+    Returns the per-source summaries plus totals across sources.
+    """
+    sources = sources or SHAREPOINT_SOURCES
+
+    def run(source):
+        try:
+            return ingest(source, push_metrics=False)
+        except Exception as e:
+            print(f"[{source['name']}] Ingestion failed: {e}")
+            return {"error": str(e)}
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(sources)))) as pool:
+        results = dict(zip((s["name"] for s in sources), pool.map(run, sources)))
+    push_ingest_metrics()
+
+    succeeded = [r for r in results.values() if "error" not in r]
+    stage_seconds = {}
+    for r in succeeded:
+        for stage, seconds in r["stage_seconds"].items():
+            stage_seconds[stage] = stage_seconds.get(stage, 0.0) + seconds
 
+    return {
+        "files": sum(r["files"] for r in succeeded),
+        "skipped_files": sum(r["skipped_files"] for r in succeeded),
+        "chunks": sum(r["chunks"] for r in succeeded),
+        "failed_sources": len(results) - len(succeeded),
+        "stage_seconds": stage_seconds,
+        "sources": results,
+    }
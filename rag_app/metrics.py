@@ -0,0 +1,192 @@
+"""
+Metrics Module
+
+Prometheus instrumentation for the query path and ingestion:
+
+- rag_stage_seconds: per-stage latency (auth, embed, retrieve, llm; batch_embed
+  and batch_retrieve for batch requests)
+- rag_request_seconds / rag_requests_in_flight: per-endpoint latency and concurrency
+- rag_llm_tokens_total: prompt/completion tokens reported by the LLM
+- rag_cache_requests_total: cache hits and misses
+- rag_admission_*: LLM slots in use, queue depth, queue wait time and rejections
+- rag_shard_failures_total: shard searches left out of a fan-out query
+- rag_singleflight_requests_total: coalesced (follower) vs executed (leader) calls
+- rag_ingest_stage_seconds / rag_ingest_items_total: ingestion stages and volumes
+
+Stage timings recorded during an API request are also collected per request
+so the API can return them in a Server-Timing header.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from prometheus_client import (
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    push_to_gateway,
+)
+
+from rag_app.config import PROMETHEUS_PUSHGATEWAY
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+STAGE_SECONDS = Histogram(
+    "rag_stage_seconds", "Time spent in each query stage", ["stage"], buckets=LATENCY_BUCKETS
+)
+REQUEST_SECONDS = Histogram(
+    "rag_request_seconds", "End-to-end request latency", ["endpoint", "status"], buckets=LATENCY_BUCKETS
+)
+IN_FLIGHT = Gauge("rag_requests_in_flight", "Requests currently being served", ["endpoint"])
+LLM_TOKENS = Counter("rag_llm_tokens_total", "Tokens reported by the LLM", ["kind"])
+CACHE_REQUESTS = Counter("rag_cache_requests_total", "Cache lookups", ["cache", "result"])
+SINGLEFLIGHT_REQUESTS = Counter(
+    "rag_singleflight_requests_total",
+    "Calls through a single-flight group; followers shared a leader's result",
+    ["group", "role"],
+)
+SHARD_FAILURES = Counter(
+    "rag_shard_failures_total", "Shard searches that timed out or failed", ["index", "reason"]
+)
+
+ADMISSION_IN_FLIGHT = Gauge("rag_admission_in_flight", "LLM slots currently held")
+ADMISSION_QUEUE_DEPTH = Gauge("rag_admission_queue_depth", "Requests waiting for an LLM slot")
+ADMISSION_WAIT_SECONDS = Histogram(
+    "rag_admission_wait_seconds", "Time spent waiting for an LLM slot", ["priority"], buckets=LATENCY_BUCKETS
+)
+ADMISSION_REJECTED = Counter("rag_admission_rejected_total", "Requests rejected with 429", ["reason"])
+
+INGEST_STAGE_SECONDS = Histogram(
+    "rag_ingest_stage_seconds", "Time spent in each ingestion stage", ["stage"], buckets=LATENCY_BUCKETS
+)
+INGEST_ITEMS = Counter("rag_ingest_items_total", "Items processed by ingestion", ["item"])
+
+# Stage durations for the current API request (None outside a request)
+_request_timings: ContextVar[Optional[dict]] = ContextVar("rag_request_timings", default=None)
+
+
+def start_request_timings() -> dict:
+    """Begin collecting stage timings for the current request."""
+    timings: dict[str, float] = {}
+    _request_timings.set(timings)
+    return timings
+
+
+def record_stage(stage: str, seconds: float):
+    """Record a query stage duration in Prometheus and the current request."""
+    STAGE_SECONDS.labels(stage).observe(seconds)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+def record_request_timing(name: str, seconds: float):
+    """Add a duration to the current request's Server-Timing only."""
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+@contextmanager
+def timed_stage(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+
+@contextmanager
+def untimed_request():
+    """
+    Record stages inside the block in Prometheus only, not in Server-Timing.
+
+    For concurrent calls, whose summed durations would exceed the request's
+    wall time; the caller records the phase's wall time instead. Tasks and
+    threads started inside the block inherit this.
+    """
+    token = _request_timings.set(None)
+    try:
+        yield
+    finally:
+        _request_timings.reset(token)
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def server_timing_header(timings: dict) -> str:
+    """Format stage timings (seconds) as a Server-Timing header value."""
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items())
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """LangChain callback recording retriever and LLM latency plus token usage."""
+
+    def __init__(self):
+        self._starts: dict[UUID, float] = {}
+
+    def _start(self, run_id: UUID):
+        self._starts[run_id] = time.perf_counter()
+
+    def _end(self, run_id: UUID, stage: str):
+        start = self._starts.pop(run_id, None)
+        if start is not None:
+            record_stage(stage, time.perf_counter() - start)
+
+    def on_retriever_start(self, serialized, query, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        self._end(run_id, "retrieve")
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, "retrieve")
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._end(run_id, "llm")
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        if usage.get("prompt_tokens"):
+            LLM_TOKENS.labels("prompt").inc(usage["prompt_tokens"])
+        if usage.get("completion_tokens"):
+            LLM_TOKENS.labels("completion").inc(usage["completion_tokens"])
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, "llm")
+
+
+metrics_callback = MetricsCallbackHandler()
+
+
+@contextmanager
+def timed_ingest_stage(stage: str, totals: Optional[dict] = None):
+    """Time an ingestion stage; optionally accumulate into a per-run totals dict."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        INGEST_STAGE_SECONDS.labels(stage).observe(elapsed)
+        if totals is not None:
+            totals[stage] = totals.get(stage, 0.0) + elapsed
+
+
+def push_ingest_metrics(job: str = "rag_ingest"):
+    """Push metrics to a Prometheus Pushgateway, if one is configured."""
+    if not PROMETHEUS_PUSHGATEWAY:
+        return
+    try:
+        push_to_gateway(PROMETHEUS_PUSHGATEWAY, job=job, registry=REGISTRY)
+    except OSError as e:
+        print(f"Warning: Could not push metrics to {PROMETHEUS_PUSHGATEWAY}: {e}")
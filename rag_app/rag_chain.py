@@ -4,7 +4,10 @@ RAG Chain Module
 Provides both unsecured and permission-aware RAG chains.
 The secure version applies Azure Search security filters based on user groups.
 """
-from typing import Optional
+import asyncio
+import time
+from typing import AsyncContextManager, Callable, Optional
+from anyio import to_thread
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
@@ -12,16 +15,34 @@ from langchain_core.runnables import RunnablePassthrough, RunnableLambda
 
 from rag_app.azure_search import vector_store
 from rag_app.config import *
+from rag_app.embeddings import embeddings
+from rag_app.sharded_search import ShardedRetriever, search_by_vector
+from rag_app.metrics import metrics_callback, record_request_timing, timed_stage, untimed_request
+from rag_app.singleflight import SingleFlight, normalize_question, principals_hash
 
 # LLM
 llm = ChatOpenAI(
     api_key=OPENAI_API_KEY,
     model=OPENAI_CHAT_MODEL,
+    base_url=OPENAI_BASE_URL,
     temperature=0.2
 )
 
+
+def create_retriever(k: int = 5, filters: Optional[str] = None):
+    """
+    Retriever over the index, or a fan-out over every shard index when
+    SHAREPOINT_SOURCES defines more than one.
+    """
+    if len(SEARCH_INDEXES) > 1:
+        return ShardedRetriever(k=k, filter_expr=filters)
+    if filters is None:
+        return vector_store.as_retriever(k=k)
+    return vector_store.as_retriever(k=k, filters=filters)
+
+
 # Default retriever (no security filtering)
-retriever = vector_store.as_retriever(k=5)
+retriever = create_retriever(k=5)
 
 # Prompt
 prompt = ChatPromptTemplate.from_template(
@@ -39,6 +60,7 @@ Question:
 )
 
 # Default RAG chain (LCEL) - no security filtering
+# metrics_callback records retrieve/llm stage latency and token usage
 rag_chain = (
     {
         "context": retriever,
@@ -47,7 +69,22 @@ rag_chain = (
     | prompt
     | llm
     | StrOutputParser()
-)
+).with_config(callbacks=[metrics_callback])
+
+
+def build_security_filter(user_principals: list[str]) -> str:
+    """
+    Build the OData filter restricting results to the user's principals.
+
+    Returns an always-false filter when there are no principals (no access).
+    """
+    if not user_principals:
+        return "1 eq 0"
+
+    # Build OData filter: search.in(allowed_groups, 'id1,id2,id3', ',')
+    # This returns documents where allowed_groups contains any of the provided IDs
+    principals_str = ",".join(user_principals)
+    return f"allowed_groups/any(g: search.in(g, '{principals_str}', ','))"
 
 
 def create_secure_retriever(user_principals: list[str], k: int = 5):
@@ -64,16 +101,7 @@ def create_secure_retriever(user_principals: list[str], k: int = 5):
     Returns:
         A retriever that only returns documents the user has access to
     """
-    if not user_principals:
-        # No principals = no access
-        return vector_store.as_retriever(k=k, filters="1 eq 0")  # Always false filter
-    
-    # Build OData filter: search.in(allowed_groups, 'id1,id2,id3', ',')
-    # This returns documents where allowed_groups contains any of the provided IDs
-    principals_str = ",".join(user_principals)
-    filter_expr = f"allowed_groups/any(g: search.in(g, '{principals_str}', ','))"
-    
-    return vector_store.as_retriever(k=k, filters=filter_expr)
+    return create_retriever(k=k, filters=build_security_filter(user_principals))
 
 
 def create_secure_rag_chain(user_principals: list[str]):
@@ -96,7 +124,7 @@ def create_secure_rag_chain(user_principals: list[str]):
         | prompt
         | llm
         | StrOutputParser()
-    )
+    ).with_config(callbacks=[metrics_callback])
 
 
 def invoke_secure(question: str, user_principals: Optional[list[str]] = None) -> str:
@@ -110,6 +138,49 @@ def invoke_secure(question: str, user_principals: Optional[list[str]] = None) ->
     Returns:
         The generated answer
     """
+    return _invoke(question, user_principals)
+
+
+# Identical concurrent questions from the same principal set share one answer
+question_flight = SingleFlight("question")
+
+
+async def ainvoke_secure(
+    question: str,
+    user_principals: Optional[list[str]] = None,
+    slot: Optional[Callable[[], AsyncContextManager]] = None,
+) -> str:
+    """
+    Async invoke_secure for the API.
+
+    Concurrent calls with the same normalized question and principal set are
+    coalesced on the event loop into one retrieval and generation (see
+    COALESCE_QUESTIONS). The chain itself runs in a worker thread.
+
+    Args:
+        question: The user's question
+        user_principals: If provided, applies security filtering
+        slot: Async context manager factory held around retrieval and
+            generation, e.g. an admission slot. Coalesced callers never enter
+            it, since they make no LLM call of their own.
+
+    Returns:
+        The generated answer
+    """
+    async def run():
+        if slot is None:
+            return await to_thread.run_sync(_invoke, question, user_principals)
+        async with slot():
+            return await to_thread.run_sync(_invoke, question, user_principals)
+
+    if not COALESCE_QUESTIONS:
+        return await run()
+
+    key = (normalize_question(question), principals_hash(user_principals))
+    return await question_flight.do(key, run)
+
+
+def _invoke(question: str, user_principals: Optional[list[str]]) -> str:
     if user_principals:
         chain = create_secure_rag_chain(user_principals)
     else:
@@ -117,3 +188,97 @@ def invoke_secure(question: str, user_principals: Optional[list[str]] = None) ->
     
     return chain.invoke(question)
 
+
+# Generation step on its own, for callers that retrieve context themselves
+generation_chain = (prompt | llm | StrOutputParser()).with_config(callbacks=[metrics_callback])
+
+
+async def abatch_secure(
+    questions: list[str],
+    user_principals: Optional[list[str]] = None,
+    secure: bool = False,
+    k: int = 5,
+) -> dict:
+    """
+    Answer many questions with one embedding call and concurrent retrieval.
+
+    1. Embeds every question in a single embeddings request
+    2. Runs the (optionally filtered) searches concurrently, BATCH_CONCURRENCY at a time
+    3. Generates answers with generation_chain.abatch under the same cap
+
+    Failures are reported per question rather than failing the batch.
+
+    The single embedding call is recorded as the "batch_embed" stage and each
+    search as "batch_retrieve", apart from single-query stages. Server-Timing
+    gets the wall time of each phase rather than the sum of concurrent calls.
+
+    Args:
+        questions: The questions to answer
+        user_principals: Principals for security filtering when secure is True
+        secure: Apply the allowed_groups security filter
+        k: Documents retrieved per question
+
+    Returns:
+        Per-question results plus aggregate timings in milliseconds
+    """
+    start = time.perf_counter()
+    filter_expr = build_security_filter(user_principals or []) if secure else None
+    results: list[dict] = [{"question": q} for q in questions]
+    timings: dict[str, float] = {}
+
+    # 1. One embedding call for the whole batch
+    phase = time.perf_counter()
+    with timed_stage("batch_embed"):
+        vectors = await embeddings.aembed_documents(questions)
+    timings["embed_ms"] = (time.perf_counter() - phase) * 1000
+
+    # 2. Concurrent retrieval; the search client is sync, so run it in threads
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def retrieve(question, vector):
+        async with semaphore:
+            with timed_stage("batch_retrieve"):
+                return await asyncio.to_thread(search_by_vector, question, vector, filter_expr, k)
+
+    phase = time.perf_counter()
+    with untimed_request():
+        contexts = await asyncio.gather(
+            *(retrieve(q, v) for q, v in zip(questions, vectors)),
+            return_exceptions=True,
+        )
+    elapsed = time.perf_counter() - phase
+    record_request_timing("batch_retrieve", elapsed)
+    timings["retrieve_ms"] = elapsed * 1000
+
+    pending = []
+    for i, context in enumerate(contexts):
+        if isinstance(context, Exception):
+            results[i]["error"] = f"Retrieval failed: {context}"
+        else:
+            pending.append(i)
+
+    # 3. Generation for every question whose retrieval succeeded
+    phase = time.perf_counter()
+    with untimed_request():
+        answers = await generation_chain.abatch(
+            [{"context": contexts[i], "question": questions[i]} for i in pending],
+            config={"max_concurrency": BATCH_CONCURRENCY},
+            return_exceptions=True,
+        )
+    elapsed = time.perf_counter() - phase
+    record_request_timing("batch_generate", elapsed)
+    timings["generate_ms"] = elapsed * 1000
+
+    for i, answer in zip(pending, answers):
+        if isinstance(answer, Exception):
+            results[i]["error"] = f"Generation failed: {answer}"
+        else:
+            results[i]["answer"] = answer
+
+    timings["total_ms"] = (time.perf_counter() - start) * 1000
+    return {
+        "results": results,
+        "count": len(results),
+        "errors": sum("error" in r for r in results),
+        "timings": timings,
+    }
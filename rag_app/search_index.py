@@ -0,0 +1,82 @@
+"""
+Search Index Schema
+
+Field definitions for the RAG index and the vector store built on them.
+Importing this module has no side effects, so tools such as snapshot restore
+can build the schema for a known vector size without embedding anything or
+touching the primary index.
+"""
+from typing import Callable
+
+from langchain_community.vectorstores.azuresearch import AzureSearch
+from azure.search.documents.indexes.models import (
+    SearchableField,
+    SearchField,
+    SearchFieldDataType,
+    SimpleField,
+)
+from rag_app.config import AZURE_SEARCH_ENDPOINT, AZURE_SEARCH_KEY
+
+VECTOR_FIELD = "content_vector"
+
+
+def build_fields(dimensions: int) -> list[SearchField]:
+    """Index schema with security field, for vectors of the given size."""
+    return [
+        SimpleField(
+            name="id",
+            type=SearchFieldDataType.String,
+            key=True,
+            filterable=True,
+            sortable=True,  # Allows keyset paging for snapshot export
+        ),
+        SearchableField(
+            name="content",
+            type=SearchFieldDataType.String,
+            searchable=True,
+        ),
+        SearchField(
+            name=VECTOR_FIELD,
+            type=SearchFieldDataType.Collection(SearchFieldDataType.Single),
+            searchable=True,
+            vector_search_dimensions=dimensions,
+            vector_search_profile_name="myHnswProfile",
+        ),
+        SearchableField(
+            name="metadata",
+            type=SearchFieldDataType.String,
+            searchable=True,
+        ),
+        # Field for storing allowed group/user IDs for security filtering
+        SimpleField(
+            name="allowed_groups",
+            type=SearchFieldDataType.Collection(SearchFieldDataType.String),
+            filterable=True,
+        ),
+        SimpleField(
+            name="source",
+            type=SearchFieldDataType.String,
+            filterable=True,
+        ),
+    ]
+
+
+def vector_dimensions(fields: list[SearchField]) -> int:
+    return next(f for f in fields if f.name == VECTOR_FIELD).vector_search_dimensions
+
+
+def open_vector_store(
+    index_name: str,
+    fields: list[SearchField],
+    embedding_function: Callable[[str], list[float]],
+) -> AzureSearch:
+    """Vector store for one index; creates the index from `fields` if missing."""
+    return AzureSearch(
+        azure_search_endpoint=AZURE_SEARCH_ENDPOINT,
+        azure_search_key=AZURE_SEARCH_KEY,
+        index_name=index_name,
+        embedding_function=embedding_function,
+        fields=fields,
+        # Otherwise AzureSearch embeds a probe string to size its default schema
+        vector_search_dimensions=vector_dimensions(fields),
+    )
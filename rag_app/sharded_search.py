@@ -0,0 +1,132 @@
+"""
+Sharded Search Module
+
+When SHAREPOINT_SOURCES puts libraries into separate indexes (shards), a query
+is embedded once, searched on every shard concurrently and the results merged
+by score into one top-k. Each shard gets SHARD_TIMEOUT_S; a slow or failing
+shard is left out of the merge instead of stalling the query.
+
+The timeout is applied to the HTTP call itself, so a stalled search frees its
+worker, and each shard has its own worker pool, so a slow shard can only back
+up its own queue and never delays searches on the healthy shards.
+"""
+import json
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import lru_cache
+from typing import Optional
+
+from azure.search.documents.models import VectorizedQuery
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from rag_app.azure_search import get_vector_store
+from rag_app.config import SEARCH_INDEXES, SHARD_TIMEOUT_S
+from rag_app.embeddings import embed_query
+from rag_app.metrics import SHARD_FAILURES
+
+# Concurrent searches per shard index
+WORKERS_PER_SHARD = 8
+
+
+@lru_cache(maxsize=None)
+def _shard_pool(index_name: str) -> ThreadPoolExecutor:
+    """Worker pool for one shard; long-lived so callers never block on executor shutdown."""
+    return ThreadPoolExecutor(max_workers=WORKERS_PER_SHARD, thread_name_prefix=f"shard-{index_name}")
+
+
+def search_shard(
+    index_name: str,
+    question: str,
+    vector: list[float],
+    filter_expr: Optional[str] = None,
+    k: int = 5,
+    timeout_s: Optional[float] = None,
+) -> list[tuple[Document, float]]:
+    """
+    Hybrid search on one index with a precomputed query vector.
+
+    With timeout_s, the connection and every read are bounded and the call is
+    not retried, so it raises instead of holding its thread past the deadline.
+    """
+    options = {}
+    if timeout_s is not None:
+        options = {"connection_timeout": timeout_s, "read_timeout": timeout_s, "retry_total": 0}
+    results = get_vector_store(index_name).client.search(
+        search_text=question,
+        vector_queries=[VectorizedQuery(vector=vector, k_nearest_neighbors=k, fields="content_vector")],
+        filter=filter_expr,
+        top=k,
+        **options,
+    )
+    return [
+        (
+            Document(
+                page_content=r["content"],
+                metadata=json.loads(r["metadata"]) if r.get("metadata") else {},
+            ),
+            r["@search.score"],
+        )
+        for r in results
+    ]
+
+
+def search_by_vector(
+    question: str,
+    vector: list[float],
+    filter_expr: Optional[str] = None,
+    k: int = 5,
+    indexes: Optional[list[str]] = None,
+    timeout_s: float = SHARD_TIMEOUT_S,
+) -> list[Document]:
+    """
+    Hybrid search with a precomputed query vector across all shard indexes.
+
+    Same query as the default retriever, but skips embedding the question so
+    callers can embed once (or a whole batch at once).
+
+    Raises RuntimeError only if every shard failed or timed out.
+    """
+    indexes = indexes or SEARCH_INDEXES
+    if len(indexes) == 1:
+        return [doc for doc, _ in search_shard(indexes[0], question, vector, filter_expr, k)]
+
+    futures = {
+        _shard_pool(name).submit(search_shard, name, question, vector, filter_expr, k, timeout_s): name
+        for name in indexes
+    }
+    done, not_done = wait(futures, timeout=timeout_s)
+
+    for future in not_done:
+        # Drops it if still queued; a running search ends at its own HTTP timeout
+        future.cancel()
+        SHARD_FAILURES.labels(futures[future], "timeout").inc()
+        print(f"Warning: Shard {futures[future]} timed out after {timeout_s}s")
+
+    hits: list[tuple[Document, float]] = []
+    succeeded = 0
+    for future in done:
+        try:
+            hits.extend(future.result())
+            succeeded += 1
+        except Exception as e:
+            SHARD_FAILURES.labels(futures[future], "error").inc()
+            print(f"Warning: Shard {futures[future]} failed: {e}")
+
+    if not succeeded:
+        raise RuntimeError(f"All {len(indexes)} shard searches failed or timed out")
+
+    hits.sort(key=lambda hit: hit[1], reverse=True)
+    return [doc for doc, _ in hits[:k]]
+
+
+class ShardedRetriever(BaseRetriever):
+    """Retriever that fans a query out to every shard index and merges the top-k."""
+
+    k: int = 5
+    filter_expr: Optional[str] = None
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        return search_by_vector(query, embed_query(query), self.filter_expr, self.k)
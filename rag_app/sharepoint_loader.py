@@ -1,9 +1,12 @@
 import os
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
 from msal import ConfidentialClientApplication, PublicClientApplication
 import webbrowser
 from rag_app.config import *
+from rag_app.document_parser import file_extension
 from dotenv import load_dotenv
 
 load_dotenv()  # This loads variables from .env into os.environ
@@ -46,6 +49,9 @@ def get_token():
 
     # return token["access_token"]
 
+    if GRAPH_ACCESS_TOKEN:
+        return GRAPH_ACCESS_TOKEN
+
     app = ConfidentialClientApplication(
         CLIENT_ID,
         authority=f"https://login.microsoftonline.com/{TENANT_ID}",
@@ -53,33 +59,122 @@ def get_token():
     )
     return app.acquire_token_for_client(scopes=GRAPH_SCOPE)["access_token"]
 
-def list_files():
+def list_files(drive_id=None, folder_id=None):
     token = get_token()
     headers = {"Authorization": f"Bearer {token}"}
-    url = f"https://graph.microsoft.com/v1.0/drives/{DRIVE_ID}/items/{FOLDER_ID}/children"
+    url = f"{GRAPH_API_BASE}/drives/{drive_id or DRIVE_ID}/items/{folder_id or FOLDER_ID}/children"
     return requests.get(url, headers=headers).json()["value"]
 
-def download_file(file_id, filename):
+def download_file(file_id, filename, size=None, download_url=None, drive_id=None):
+    """
+    Download a file to the temp directory and return its path.
+
+    Files of at least RANGED_DOWNLOAD_THRESHOLD_MB (per the listing's size) are
+    fetched as parallel Range requests. download_url is the listing's
+    pre-authenticated @microsoft.graph.downloadUrl, used when available.
+    """
+    # Named by file ID (unique per drive) in a per-drive directory: same-named
+    # files in different folders or libraries ingested concurrently must never
+    # overwrite each other, or one file's text would be indexed under the
+    # other's permissions. The extension is kept for the parser.
+    download_dir = os.path.join(tempfile.gettempdir(), drive_id) if drive_id else tempfile.gettempdir()
+    os.makedirs(download_dir, exist_ok=True)
+    path = os.path.join(download_dir, f"{file_id}{file_extension(filename)}")
+
+    if size and size >= RANGED_DOWNLOAD_THRESHOLD_MB * 1024 * 1024:
+        if download_ranged(file_id, path, size, download_url, drive_id):
+            return path
+
     token = get_token()
     headers = {"Authorization": f"Bearer {token}"}
-    url = f"https://graph.microsoft.com/v1.0/drives/{DRIVE_ID}/items/{file_id}/content"
+    url = f"{GRAPH_API_BASE}/drives/{drive_id or DRIVE_ID}/items/{file_id}/content"
     r = requests.get(url, headers=headers)
+    r.raise_for_status()
 
-    path = os.path.join(tempfile.gettempdir(), filename)
     with open(path, "wb") as f:
         f.write(r.content)
     return path
 
-def get_file_permissions(file_id):
+
+def download_ranged(file_id, path, size, download_url=None, drive_id=None):
+    """
+    Fetch a file as DOWNLOAD_PART_SIZE_MB parts with DOWNLOAD_WORKERS parallel
+    HTTP Range requests, writing each part at its offset so the file is
+    reassembled in order.
+
+    The first part is requested on its own; the rest are only fanned out once
+    it comes back as a 206 with the expected Content-Range. Returns False (and
+    leaves the caller to do a plain GET) if the server does not honour Range
+    requests; raises on auth, not-found and server errors.
+    """
+    if download_url:
+        # Pre-authenticated URL: no bearer token needed
+        url, headers = download_url, {}
+    else:
+        url = f"{GRAPH_API_BASE}/drives/{drive_id or DRIVE_ID}/items/{file_id}/content"
+        headers = {"Authorization": f"Bearer {get_token()}"}
+
+    part_size = max(1, int(DOWNLOAD_PART_SIZE_MB * 1024 * 1024))
+    ranges = [(start, min(start + part_size, size) - 1) for start in range(0, size, part_size)]
+
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_maxsize=DOWNLOAD_WORKERS))
+    session.mount("http://", HTTPAdapter(pool_maxsize=DOWNLOAD_WORKERS))
+
+    def request_part(byte_range):
+        """GET one range; None if the server answered without honouring it."""
+        start, end = byte_range
+        # Streamed so a full-body reply can be dropped without downloading it
+        r = session.get(url, headers={**headers, "Range": f"bytes={start}-{end}"}, stream=True)
+        if r.status_code == 206 and r.headers.get("Content-Range") == f"bytes {start}-{end}/{size}":
+            return r
+        r.close()
+        # 416: the listing's size is stale; a plain GET still works
+        if r.status_code >= 400 and r.status_code != 416:
+            r.raise_for_status()
+        return None
+
+    def write_part(byte_range, r):
+        start, end = byte_range
+        with r:
+            content = r.content
+        if len(content) != end - start + 1:
+            raise OSError(f"Short read for {file_id} bytes {start}-{end}: got {len(content)}")
+        with open(path, "r+b") as f:
+            f.seek(start)
+            f.write(content)
+
+    def fetch(byte_range):
+        r = request_part(byte_range)
+        if r is None:
+            raise OSError(f"Range request for {file_id} bytes {byte_range[0]}-{byte_range[1]} was not honoured")
+        write_part(byte_range, r)
+
+    first = request_part(ranges[0])
+    if first is None:
+        print(f"Warning: Range requests not supported for {file_id}, downloading in one request")
+        return False
+
+    with open(path, "wb") as f:
+        f.truncate(size)
+    write_part(ranges[0], first)
+
+    with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as pool:
+        # list() surfaces the first failed part
+        list(pool.map(fetch, ranges[1:]))
+    return True
+
+def get_file_permissions(file_id, drive_id=None):
     """
     Fetch permissions for a file from SharePoint via MS Graph API.
     Returns a list of user and group IDs that have access to the file.
     
     Uses: GET /drives/{drive-id}/items/{item-id}/permissions
+    drive_id defaults to DRIVE_ID.
     """
     token = get_token()
     headers = {"Authorization": f"Bearer {token}"}
-    url = f"https://graph.microsoft.com/v1.0/drives/{DRIVE_ID}/items/{file_id}/permissions"
+    url = f"{GRAPH_API_BASE}/drives/{drive_id or DRIVE_ID}/items/{file_id}/permissions"
     
     response = requests.get(url, headers=headers)
     if response.status_code != 200:
@@ -0,0 +1,59 @@
+"""
+Single-Flight Module
+
+Coalesces identical concurrent calls: the first caller for a key (the leader)
+starts the work, and callers arriving while it is in flight (followers) await
+the same result or exception.
+
+Calls are coalesced on the event loop, so followers wait without holding a
+worker thread.
+"""
+import asyncio
+import hashlib
+import re
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+from rag_app.metrics import SINGLEFLIGHT_REQUESTS
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+class SingleFlight:
+    """Single-flight group for coroutines; use from one event loop."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn once for all concurrent callers with the same key."""
+        task = self._calls.get(key)
+        if task is not None:
+            SINGLEFLIGHT_REQUESTS.labels(self.name, "follower").inc()
+        else:
+            SINGLEFLIGHT_REQUESTS.labels(self.name, "leader").inc()
+            task = self._calls[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda done: self._finish(key, done))
+
+        # Shielded so a caller that goes away doesn't cancel the others' answer
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        # Runs before any waiter resumes, so later arrivals start a fresh call
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # Mark retrieved even if every caller went away
+
+
+def normalize_question(question: str) -> str:
+    """Case- and whitespace-insensitive form of a question."""
+    return _WHITESPACE_RE.sub(" ", question).strip().casefold()
+
+
+def principals_hash(user_principals: Optional[list[str]]) -> str:
+    """Order-independent hash of a principal set ("" for unauthenticated)."""
+    if not user_principals:
+        return ""
+    joined = "\n".join(sorted(set(user_principals)))
+    return hashlib.sha256(joined.encode("utf-8")).hexdigest()
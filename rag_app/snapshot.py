@@ -0,0 +1,295 @@
+"""
+Index Snapshot Module
+
+Exports an Azure Search index to a local snapshot and restores it without
+re-embedding, so schema changes and disaster recovery don't require
+re-running download/parse/embed.
+
+Snapshot layout (one directory):
+- manifest.json      index name, field names, vector field/dimensions, document count
+- records.jsonl.gz   one JSON object per document with every non-vector field
+- vectors.f32        little-endian float32 vectors, one row per record, same order
+"""
+import gzip
+import itertools
+import json
+import os
+import sys
+import time
+from array import array
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Iterator
+
+from azure.core.credentials import AzureKeyCredential
+from azure.search.documents import SearchClient
+from azure.search.documents.indexes import SearchIndexClient
+
+from rag_app.config import AZURE_SEARCH_ENDPOINT, AZURE_SEARCH_KEY, AZURE_SEARCH_INDEX
+from rag_app.search_index import build_fields, open_vector_store, vector_dimensions
+
+SNAPSHOT_VERSION = 1
+MANIFEST = "manifest.json"
+RECORDS = "records.jsonl.gz"
+VECTORS = "vectors.f32"
+
+EXPORT_PAGE_SIZE = 1000
+# Azure Search rejects $skip beyond this, which bounds unsorted paging
+MAX_SKIP = 100_000
+
+
+def _credential() -> AzureKeyCredential:
+    return AzureKeyCredential(AZURE_SEARCH_KEY)
+
+
+def _to_le_bytes(vector: list[float]) -> bytes:
+    values = array("f", vector)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_le_bytes(data: bytes) -> list[float]:
+    values = array("f")
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tolist()
+
+
+def _iter_documents(client: SearchClient, select: list[str], key: str, key_sortable: bool) -> Iterator[dict]:
+    """
+    Yield every document in the index.
+
+    With a sortable key this pages by key (id gt last), which works for any
+    index size; otherwise it falls back to the SDK's skip-based paging, which
+    stops after MAX_SKIP documents.
+    """
+    if not key_sortable:
+        yield from itertools.islice(client.search(search_text="*", select=select), MAX_SKIP)
+        return
+
+    last = None
+    while True:
+        filter_expr = None
+        if last is not None:
+            escaped = last.replace("'", "''")
+            filter_expr = f"{key} gt '{escaped}'"
+        page = list(client.search(
+            search_text="*",
+            select=select,
+            filter=filter_expr,
+            order_by=[f"{key} asc"],
+            top=EXPORT_PAGE_SIZE,
+        ))
+        if not page:
+            return
+        yield from page
+        last = page[-1][key]
+
+
+def export_snapshot(path: str, index_name: str = AZURE_SEARCH_INDEX, allow_partial: bool = False) -> dict:
+    """
+    Dump every document, vector, metadata and ACL in an index to a snapshot directory.
+
+    The manifest is written last, and atomically, so a directory without one
+    is an incomplete export and cannot be restored.
+
+    Args:
+        path: Snapshot directory
+        index_name: Source index
+        allow_partial: Export only the first MAX_SKIP documents of an index
+            whose key is not sortable, instead of raising
+
+    Returns:
+        The manifest that was written
+
+    Raises:
+        ValueError: If the index is too large to export completely
+    """
+    out = Path(path)
+
+    index = SearchIndexClient(AZURE_SEARCH_ENDPOINT, _credential()).get_index(index_name)
+    key_field = next(f for f in index.fields if f.key)
+    vector_field = next(f for f in index.fields if f.vector_search_dimensions)
+    select = [f.name for f in index.fields]
+    dimensions = vector_field.vector_search_dimensions
+
+    client = SearchClient(AZURE_SEARCH_ENDPOINT, index_name, _credential())
+    total = client.get_document_count()
+    partial = not key_field.sortable and total > MAX_SKIP
+    if partial:
+        message = (
+            f"{index_name} has {total} documents but its key '{key_field.name}' is not sortable; "
+            f"only the first {MAX_SKIP} can be exported. Rebuild the index with a sortable key"
+        )
+        if not allow_partial:
+            raise ValueError(f"{message}, or allow a partial export (--allow-partial).")
+        print(f"Warning: {message}. Writing a partial snapshot.")
+
+    out.mkdir(parents=True, exist_ok=True)
+    # A manifest left by an earlier export must not vouch for the new files
+    (out / MANIFEST).unlink(missing_ok=True)
+
+    print(f"Exporting {total} documents from {index_name} to {out}...")
+    start = time.perf_counter()
+    count = 0
+    with gzip.open(out / RECORDS, "wt", encoding="utf-8") as records, open(out / VECTORS, "wb") as vectors:
+        for doc in _iter_documents(client, select, key_field.name, key_field.sortable):
+            vector = doc.get(vector_field.name)
+            if not vector or len(vector) != dimensions:
+                raise ValueError(f"Document {doc[key_field.name]} has no valid {vector_field.name}")
+
+            vectors.write(_to_le_bytes(vector))
+            records.write(json.dumps({name: doc.get(name) for name in select if name != vector_field.name}) + "\n")
+            count += 1
+            if count % 10_000 == 0:
+                print(f"  - {count} documents")
+
+    manifest = {
+        "version": SNAPSHOT_VERSION,
+        "index": index_name,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "count": count,
+        "partial": partial,
+        "key_field": key_field.name,
+        "vector_field": vector_field.name,
+        "dimensions": dimensions,
+        "fields": select,
+    }
+    tmp = out / f"{MANIFEST}.tmp"
+    tmp.write_text(json.dumps(manifest, indent=2))
+    os.replace(tmp, out / MANIFEST)
+    print(f"Exported {count} documents in {time.perf_counter() - start:.1f}s")
+    return manifest
+
+
+def read_manifest(path: str) -> dict:
+    manifest_path = Path(path) / MANIFEST
+    if not manifest_path.exists():
+        raise ValueError(f"No {MANIFEST} in {path}; the export is missing or did not finish")
+    manifest = json.loads(manifest_path.read_text())
+    if manifest.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version: {manifest.get('version')}")
+    return manifest
+
+
+def iter_snapshot(path: str, manifest: dict) -> Iterator[dict]:
+    """Yield snapshot documents with their vectors re-attached."""
+    row_bytes = manifest["dimensions"] * 4
+    with gzip.open(Path(path) / RECORDS, "rt", encoding="utf-8") as records, \
+            open(Path(path) / VECTORS, "rb") as vectors:
+        for line in records:
+            doc = json.loads(line)
+            data = vectors.read(row_bytes)
+            if len(data) != row_bytes:
+                raise ValueError("Snapshot vectors file is shorter than its records")
+            doc[manifest["vector_field"]] = _from_le_bytes(data)
+            yield doc
+
+
+def _no_embedding(text: str) -> list[float]:
+    raise RuntimeError("Snapshot restore uploads stored vectors and never embeds")
+
+
+def _upload(client: SearchClient, batch: list[dict]) -> int:
+    """Upload one batch; returns the number of failed documents."""
+    results = client.upload_documents(documents=batch)
+    failed = [r for r in results if not r.succeeded]
+    for r in failed[:5]:
+        print(f"Warning: Failed to restore {r.key}: {r.error_message}")
+    return len(failed)
+
+
+def restore_snapshot(
+    path: str,
+    index_name: str = AZURE_SEARCH_INDEX,
+    workers: int = 8,
+    batch_size: int = 100,
+    recreate: bool = False,
+) -> dict:
+    """
+    Recreate the index schema from search_index.build_fields and bulk-load a snapshot.
+
+    The schema is built for the snapshot's vector size, so restoring makes no
+    embedding calls. Batches are uploaded by a pool of workers. Fields that are
+    in the snapshot but no longer in the schema are dropped (with a warning),
+    so a snapshot can be restored into a changed schema.
+
+    Args:
+        path: Snapshot directory
+        index_name: Target index (created if missing)
+        workers: Concurrent upload requests
+        batch_size: Documents per upload request
+        recreate: Delete the target index first
+
+    Returns:
+        Counts of uploaded and failed documents
+    """
+    manifest = read_manifest(path)
+    if manifest.get("partial"):
+        print(f"Warning: Snapshot is partial; it holds only {manifest['count']} documents of {manifest['index']}")
+
+    fields = build_fields(manifest["dimensions"])
+    schema_names = {f.name for f in fields}
+    if manifest["vector_field"] not in schema_names:
+        raise ValueError(f"Snapshot vector field {manifest['vector_field']} is not in the current schema")
+
+    dropped = [name for name in manifest["fields"] if name not in schema_names]
+    if dropped:
+        print(f"Warning: Fields not in the current schema will be dropped: {', '.join(dropped)}")
+
+    index_client = SearchIndexClient(AZURE_SEARCH_ENDPOINT, _credential())
+    if recreate:
+        print(f"Deleting index: {index_name}...")
+        try:
+            index_client.delete_index(index_name)
+        except Exception as e:
+            print(f"Warning: Could not delete index (it might not exist): {e}")
+
+    # Constructing the vector store creates the index from `fields` if it is missing
+    open_vector_store(index_name, fields, _no_embedding)
+    existing = next(
+        f for f in index_client.get_index(index_name).fields if f.name == manifest["vector_field"]
+    )
+    if existing.vector_search_dimensions != vector_dimensions(fields):
+        raise ValueError(
+            f"Snapshot vectors have {manifest['dimensions']} dimensions, "
+            f"index {index_name} expects {existing.vector_search_dimensions}; restore with --recreate"
+        )
+
+    client = SearchClient(AZURE_SEARCH_ENDPOINT, index_name, _credential())
+
+    print(f"Restoring {manifest['count']} documents into {index_name} ({workers} workers)...")
+    start = time.perf_counter()
+    uploaded = failed = 0
+    pending = set()
+
+    def collect(done):
+        nonlocal failed
+        for future in done:
+            failed += future.result()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        batch: list[dict] = []
+        for doc in iter_snapshot(path, manifest):
+            batch.append({k: v for k, v in doc.items() if k in schema_names})
+            if len(batch) < batch_size:
+                continue
+
+            # Keep a bounded number of batches in memory
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            pending.add(pool.submit(_upload, client, batch))
+            uploaded += len(batch)
+            batch = []
+
+        if batch:
+            pending.add(pool.submit(_upload, client, batch))
+            uploaded += len(batch)
+        collect(wait(pending).done)
+
+    elapsed = time.perf_counter() - start
+    print(f"Restored {uploaded - failed} documents ({failed} failed) in {elapsed:.1f}s")
+    return {"uploaded": uploaded - failed, "failed": failed, "seconds": elapsed}
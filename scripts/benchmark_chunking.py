@@ -0,0 +1,88 @@
+"""
+Chunking throughput benchmark.
+
+Compares the legacy character splitter with the token-based, structure-aware
+chunker on either local documents or synthetic pages.
+
+Usage:
+    python scripts/benchmark_chunking.py                  # synthetic pages
+    python scripts/benchmark_chunking.py docs/*.pdf       # real files
+    python scripts/benchmark_chunking.py --pages 5000
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from rag_app.chunking import chunk_segments, count_tokens
+from rag_app.document_parser import iter_segments
+
+WORDS = (
+    "revenue forecast quarter policy employee onboarding contract renewal "
+    "budget approval security review roadmap milestone customer escalation "
+    "compliance audit vendor invoice travel expense headcount"
+).split()
+
+
+def synthetic_segments(pages: int, seed: int = 0) -> list[str]:
+    """Pages of 3-8 paragraphs with 20-120 words each."""
+    rng = random.Random(seed)
+    segments = []
+    for _ in range(pages):
+        paragraphs = [
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 120))) + "."
+            for _ in range(rng.randint(3, 8))
+        ]
+        segments.append("\n\n".join(paragraphs))
+    return segments
+
+
+def run(strategy: str, documents: list[list[str]]) -> dict:
+    n_bytes = sum(len(s.encode("utf-8")) for doc in documents for s in doc)
+
+    start = time.perf_counter()
+    chunks = [c for doc in documents for c in chunk_segments(iter(doc), strategy=strategy)]
+    elapsed = time.perf_counter() - start
+
+    sizes = [count_tokens(c) for c in chunks] or [0]
+    return {
+        "strategy": strategy,
+        "seconds": elapsed,
+        "mb_per_s": n_bytes / 1e6 / elapsed if elapsed else 0.0,
+        "chunks": len(chunks),
+        "tokens_mean": statistics.mean(sizes),
+        "tokens_stdev": statistics.pstdev(sizes),
+        "tokens_min": min(sizes),
+        "tokens_max": max(sizes),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", help="Documents to chunk (default: synthetic pages)")
+    parser.add_argument("--pages", type=int, default=2000, help="Synthetic pages when no files are given")
+    args = parser.parse_args()
+
+    if args.files:
+        documents = [list(iter_segments(f)) for f in args.files]
+    else:
+        documents = [synthetic_segments(args.pages)]
+
+    # Warm the tiktoken encoding so it is not counted against the first run
+    count_tokens("warmup")
+
+    print(f"{'strategy':<12}{'seconds':>10}{'MB/s':>10}{'chunks':>10}{'tok mean':>10}{'tok sd':>10}{'min':>7}{'max':>7}")
+    for strategy in ("characters", "tokens"):
+        r = run(strategy, documents)
+        print(
+            f"{r['strategy']:<12}{r['seconds']:>10.3f}{r['mb_per_s']:>10.2f}{r['chunks']:>10}"
+            f"{r['tokens_mean']:>10.1f}{r['tokens_stdev']:>10.1f}{r['tokens_min']:>7}{r['tokens_max']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Export an Azure Search index to a local snapshot, or restore one without re-embedding.
+
+Usage:
+    python scripts/index_snapshot.py export snapshots/2024-06-01
+    python scripts/index_snapshot.py restore snapshots/2024-06-01 --recreate
+    python scripts/index_snapshot.py restore snapshots/2024-06-01 --index sharepoint-rag-v2 --workers 16
+"""
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from rag_app.config import AZURE_SEARCH_INDEX
+from rag_app.snapshot import export_snapshot, restore_snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export = sub.add_parser("export", help="Dump chunks, vectors, metadata and ACLs to a snapshot")
+    export.add_argument("path", help="Snapshot directory")
+    export.add_argument("--index", default=AZURE_SEARCH_INDEX, help="Source index")
+    export.add_argument(
+        "--allow-partial",
+        action="store_true",
+        help="Export only the first 100k documents when the index key is not sortable",
+    )
+
+    restore = sub.add_parser("restore", help="Recreate the index schema and bulk-load a snapshot")
+    restore.add_argument("path", help="Snapshot directory")
+    restore.add_argument("--index", default=AZURE_SEARCH_INDEX, help="Target index")
+    restore.add_argument("--workers", type=int, default=8, help="Concurrent upload requests")
+    restore.add_argument("--batch-size", type=int, default=100, help="Documents per upload request")
+    restore.add_argument("--recreate", action="store_true", help="Delete the target index first")
+
+    args = parser.parse_args()
+    try:
+        if args.command == "export":
+            export_snapshot(args.path, args.index, args.allow_partial)
+        else:
+            restore_snapshot(args.path, args.index, args.workers, args.batch_size, args.recreate)
+    except ValueError as e:
+        sys.exit(f"Error: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,9 +3,9 @@ from pathlib import Path
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
-from rag_app.ingestion import ingest
+from rag_app.ingestion import ingest_all
 
 if __name__ == "__main__":
-    ingest()
+    ingest_all()
 
 print(sys.path)
\ No newline at end of file